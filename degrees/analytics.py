@@ -0,0 +1,145 @@
+import argparse
+import multiprocessing
+import random
+import sys
+from array import array
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate statistics over the co-star graph.")
+    parser.add_argument("directory")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep the dataset in compact arrays instead of dicts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    histogram = commands.add_parser("histogram", help="separations from one person")
+    histogram.add_argument("name")
+    commands.add_parser("components", help="connected components")
+    average = commands.add_parser("average", help="sampled average path length")
+    average.add_argument("-n", "--samples", type=int, default=100)
+    average.add_argument("-j", "--workers", type=int, default=1)
+    average.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, cache=True, compact_data=args.compact)
+    print("Data loaded.", file=sys.stderr)
+    graph = degrees.graph
+
+    if args.command == "histogram":
+        person_id = degrees.person_id_for_name(args.name, "most_connected")
+        if person_id is None:
+            sys.exit("Person not found.")
+        counts = separation_histogram(graph, graph.person_index[person_id])
+        for distance, count in enumerate(counts):
+            print(f"{distance}: {count}")
+        print(f"Eccentricity: {len(counts) - 1}")
+        print(f"Unreachable: {len(graph) - sum(counts)}")
+
+    elif args.command == "components":
+        labels, sizes = connected_components(graph)
+        print(f"{len(sizes)} components")
+        for size, count in sorted(component_size_counts(sizes).items(), reverse=True):
+            print(f"  size {size}: {count}")
+
+    else:
+        mean, pairs = average_path_length(graph, args.samples, args.workers, args.seed)
+        print(f"Average path length: {mean:.4f} ({pairs} connected pairs sampled)")
+
+
+def bfs_levels(graph, sources, labels=None, label=0):
+    """
+    Multi-source breadth-first search from the nodes in `sources`,
+    yielding each layer (a list of nodes) in order of distance.
+
+    Visited nodes are marked in `labels`, an int array with -1 for
+    unvisited nodes, by setting them to `label`. A fresh array is used
+    if none is given.
+    """
+    if labels is None:
+        labels = array("i", [-1]) * len(graph)
+    offsets, neighbors = graph.offsets, graph.neighbors
+
+    layer = []
+    for node in sources:
+        if labels[node] == -1:
+            labels[node] = label
+            layer.append(node)
+    while layer:
+        yield layer
+        next_layer = []
+        for node in layer:
+            for neighbor in neighbors[offsets[node]:offsets[node + 1]]:
+                if labels[neighbor] == -1:
+                    labels[neighbor] = label
+                    next_layer.append(neighbor)
+        layer = next_layer
+
+
+def separation_histogram(graph, source):
+    """
+    Returns a list whose i-th entry counts the people exactly i degrees
+    of separation from `source` (a node number), starting with 1 for the
+    source itself. Its length less one is the source's eccentricity.
+    """
+    return [len(layer) for layer in bfs_levels(graph, [source])]
+
+
+def connected_components(graph):
+    """
+    Labels every node with the number of its connected component.
+    Returns the labels (an int array) and the size of each component.
+    """
+    labels = array("i", [-1]) * len(graph)
+    sizes = []
+    for node in range(len(graph)):
+        if labels[node] == -1:
+            sizes.append(sum(len(layer) for layer in bfs_levels(graph, [node], labels, len(sizes))))
+    return labels, sizes
+
+
+def component_size_counts(sizes):
+    counts = dict()
+    for size in sizes:
+        counts[size] = counts.get(size, 0) + 1
+    return counts
+
+
+def average_path_length(graph, samples, workers=1, seed=None):
+    """
+    Estimates the average degrees of separation between connected people
+    from complete breadth-first searches out of `samples` random sources,
+    spread over `workers` processes.
+
+    Returns the estimate and the number of connected pairs it averages.
+    """
+    global sampled_graph
+    sampled_graph = graph
+
+    sources = random.Random(seed).sample(range(len(graph)), min(samples, len(graph)))
+    if workers > 1 and len(sources) > 1:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("parallel sampling needs the fork start method")
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            histograms = pool.map(source_histogram, sources)
+    else:
+        histograms = map(source_histogram, sources)
+
+    total = pairs = 0
+    for counts in histograms:
+        total += sum(distance * count for distance, count in enumerate(counts))
+        pairs += sum(counts) - 1
+    return (total / pairs if pairs else 0.0), pairs
+
+
+# Graph being sampled by average_path_length, inherited by forked workers
+sampled_graph = None
+
+
+def source_histogram(source):
+    return separation_histogram(sampled_graph, source)
+
+
+if __name__ == "__main__":
+    main()
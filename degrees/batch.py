@@ -0,0 +1,174 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+
+import degrees
+from nameindex import POLICIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer many degrees queries.")
+    parser.add_argument("directory")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="CSV file of name pairs (default: standard input)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument("--ambiguous", choices=["error"] + sorted(POLICIES), default="error",
+                        help="how to pick among people sharing a name (default: error)")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep the dataset in compact arrays instead of dicts")
+    parser.add_argument("--cache-mb", type=int, default=256,
+                        help="memory for cached search trees per process (default: 256)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, cache=True, compact_data=args.compact)
+    print("Data loaded.", file=sys.stderr)
+    degrees.tree_cache.maxbytes = args.cache_mb * 2 ** 20
+
+    if args.queries != "-":
+        with open(args.queries, encoding="utf-8") as f:
+            write_results(run_queries(read_queries(f), args.workers, args.directory, args.ambiguous, args.compact))
+    else:
+        write_results(run_queries(read_queries(sys.stdin), args.workers, args.directory, args.ambiguous, args.compact))
+    if args.workers == 1:
+        print(f"Tree cache: {degrees.tree_cache.stats()}", file=sys.stderr)
+
+
+def read_queries(f):
+    """
+    Yields (line, names) for each row of a CSV stream of name pairs,
+    where names lists the row's stripped fields, skipping blank rows.
+    Rows that do not hold exactly two names are left for run_queries to
+    report.
+    """
+    for line, row in enumerate(csv.reader(f), 1):
+        if not row or not any(field.strip() for field in row):
+            continue
+        yield line, [field.strip() for field in row]
+
+
+def run_queries(queries, workers=1, directory=None, ambiguous="error", compact_data=False):
+    """
+    Answers (line, [source name, target name]) queries, yielding one
+    result dict per query in input order. A query without exactly two
+    names gets a result with just its line and an error.
+
+    Queries are grouped by source, and a single breadth-first search from
+    each source answers every query sharing it. With more than one worker,
+    groups are spread over a process pool. Forked workers share the graph
+    loaded in this process; elsewhere each worker maps the snapshot for
+    `directory`, loaded in compact form if `compact_data` is true.
+
+    Names shared by several people are an error unless `ambiguous` names
+    a policy from nameindex.POLICIES to choose between them.
+    """
+    # Results waiting for every earlier query to be answered
+    pending = dict()
+    groups = dict()
+    for index, (line, names) in enumerate(queries):
+        if len(names) != 2:
+            pending[index] = {"line": line, "error": f"expected two names, got {len(names)}"}
+            continue
+        source_name, target_name = names
+        result = {"line": line, "source": source_name, "target": target_name}
+        source = resolve(source_name, result, ambiguous)
+        target = resolve(target_name, result, ambiguous)
+        if source is None or target is None:
+            pending[index] = result
+            continue
+        result["source_id"] = source
+        result["target_id"] = target
+        groups.setdefault(source, []).append((index, result))
+
+    if workers > 1 and len(groups) > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        with context.Pool(workers, initializer=load_worker, initargs=(directory, compact_data)) as pool:
+            yield from in_order(pool.imap_unordered(answer_group, groups.values()), pending)
+    else:
+        yield from in_order(map(answer_group, groups.values()), pending)
+
+
+def answer_group(group):
+    """
+    Fills in the path for each (index, result) in a group of queries that
+    share a source, returning the group.
+    """
+    graph = degrees.graph
+    source_id = group[0][1]["source_id"]
+    goals = {graph.person_index[result["target_id"]] for _, result in group}
+
+    # Reuse an earlier tree from this source if it settles every target
+    tree = degrees.tree_cache.get(source_id)
+    if tree is None or not (tree[1] or goals <= tree[0].keys()):
+        parents = graph.bfs_tree(graph.person_index[source_id], goals)
+        tree = (parents, not goals <= parents.keys())
+        degrees.tree_cache.put(source_id, tree)
+    parents = tree[0]
+    for _, result in group:
+        node = graph.person_index[result["target_id"]]
+        if node in parents:
+            path = graph.path_to(parents, node)
+            result["degrees"] = len(path)
+            result["path"] = path
+        else:
+            result["degrees"] = None
+            result["path"] = None
+    return group
+
+
+def in_order(groups, pending):
+    """
+    Yields the results of answered `groups` and of the already `pending`
+    results in order of their query index.
+    """
+    next_index = 0
+    for group in itertools.chain(groups, [[]]):
+        pending.update(group)
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+
+def load_worker(directory, compact_data):
+    if degrees.graph is None:
+        degrees.load_data(directory, cache=True, compact_data=compact_data)
+
+
+def resolve(name, result, ambiguous="error"):
+    """
+    Returns the person_id for `name`, or records why it could not be
+    resolved in `result` and returns None.
+    """
+    person_ids = degrees.person_ids_for_name(name)
+    if len(person_ids) == 1:
+        return person_ids[0]
+    if person_ids and ambiguous != "error":
+        return degrees.person_id_for_name(name, ambiguous)
+    if "error" not in result:
+        if person_ids:
+            result["error"] = f"ambiguous name: {name}"
+        else:
+            result["error"] = f"person not found: {name}"
+    return None
+
+
+def write_results(results, f=None):
+    """
+    Writes each result as one line of JSON to `f` (standard output by
+    default), flushing as it goes.
+    """
+    f = f or sys.stdout
+    for result in results:
+        f.write(json.dumps(result) + "\n")
+        f.flush()
+
+
+if __name__ == "__main__":
+    main()
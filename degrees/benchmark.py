@@ -0,0 +1,188 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+
+# How each search strategy loads the data, searches, and reports how
+# many people its last search expanded
+STRATEGIES = {
+    "bfs": (
+        dict(),
+        lambda source, target: degrees.shortest_path(source, target),
+        lambda: degrees.nodes_expanded
+    ),
+    "bidirectional": (
+        dict(),
+        lambda source, target: degrees.bidirectional_shortest_path(source, target),
+        lambda: degrees.nodes_expanded
+    ),
+    "index-bfs": (
+        dict(index=True),
+        lambda source, target: degrees.graph.shortest_path(source, target),
+        lambda: degrees.graph.nodes_expanded
+    ),
+    "index-bidirectional": (
+        dict(index=True),
+        lambda source, target: degrees.graph.bidirectional_path(source, target),
+        lambda: degrees.graph.nodes_expanded
+    ),
+    "compact-bidirectional": (
+        dict(index=True, compact_data=True),
+        lambda source, target: degrees.graph.bidirectional_path(source, target),
+        lambda: degrees.graph.nodes_expanded
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees search strategies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write a synthetic dataset")
+    generate_parser.add_argument("directory")
+    generate_parser.add_argument("--people", type=int, default=10000)
+    generate_parser.add_argument("--movies", type=int, default=5000)
+    generate_parser.add_argument("--cast", type=float, default=4,
+                                 help="mean number of stars per movie (default: 4)")
+    generate_parser.add_argument("--skew", type=float, default=1.0,
+                                 help="Zipf exponent of how often people are cast (default: 1)")
+    generate_parser.add_argument("--seed", type=int)
+
+    run_parser = commands.add_parser("run", help="time searches over a dataset")
+    run_parser.add_argument("directory")
+    run_parser.add_argument("--queries", type=int, default=200)
+    run_parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                            help="comma-separated strategies (default: all)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.directory, args.people, args.movies, args.cast, args.skew, args.seed)
+        return
+
+    strategies = args.strategies.split(",")
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            sys.exit(f"Unknown strategy: {strategy}")
+    if not args.json:
+        print(f"{'strategy':<22} {'load s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+              f"{'expanded':>10} {'peak KiB':>9}")
+    for report in run(args.directory, strategies, args.queries, args.seed):
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print(f"{report['strategy']:<22} {report['load_seconds']:>8.2f} "
+                  f"{report['p50_ms']:>9.3f} {report['p99_ms']:>9.3f} "
+                  f"{report['mean_expanded']:>10.1f} {report['peak_kib']:>9.1f}")
+
+
+def generate(directory, people, movies, cast=4, skew=1.0, seed=None):
+    """
+    Write people.csv, movies.csv and stars.csv for a random co-star graph.
+
+    Each movie's cast size is drawn from a geometric distribution with
+    mean `cast`, and people are cast with Zipf-distributed popularity of
+    exponent `skew`, so a few people appear in many movies.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            writer.writerow([i + 1, f"Person {i + 1}", rng.randint(1920, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            writer.writerow([i + 1, f"Movie {i + 1}", rng.randint(1930, 2023)])
+
+    # Cumulative popularity of people, shuffled so ids do not give it away
+    ranks = list(range(people))
+    rng.shuffle(ranks)
+    weights = list(itertools.accumulate((rank + 1) ** -skew for rank in ranks))
+
+    # Chance that a geometric cast size stops at each further star
+    stop = 1 / max(cast, 1)
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            size = 1 + int(math.log(1 - rng.random()) / math.log(1 - stop)) if stop < 1 else 1
+            stars = set(rng.choices(range(people), cum_weights=weights, k=min(size, people)))
+            for person in sorted(stars):
+                writer.writerow([person + 1, movie + 1])
+
+
+def run(directory, strategies, queries, seed=0):
+    """
+    Time `queries` searches between random people who starred in at
+    least one movie with each strategy, yielding a report dict per
+    strategy. Every strategy answers the same queries.
+    """
+    pairs = None
+    for strategy in strategies:
+        options, search, expanded = STRATEGIES[strategy]
+
+        start = time.perf_counter()
+        degrees.load_data(directory, **options)
+        load_seconds = time.perf_counter() - start
+
+        if pairs is None:
+            rng = random.Random(seed)
+            person_ids = sorted(
+                person_id for person_id, person in degrees.people.items()
+                if person["movies"]
+            )
+            pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+        latencies = []
+        total_expanded = 0
+        for source, target in pairs:
+            start = time.perf_counter()
+            search(source, target)
+            latencies.append(time.perf_counter() - start)
+            total_expanded += expanded()
+
+        # Memory is traced in a separate pass so tracing does not skew timings
+        tracemalloc.start()
+        for source, target in pairs:
+            search(source, target)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies.sort()
+        yield {
+            "strategy": strategy,
+            "queries": len(pairs),
+            "load_seconds": load_seconds,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "mean_expanded": total_expanded / len(pairs) if pairs else 0.0,
+            "peak_kib": peak / 1024
+        }
+
+
+def percentile(values, p):
+    """
+    Returns the nearest-rank `p`th percentile of sorted `values`.
+    """
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+import csv
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+class CompactData():
+    """
+    People, movies and who starred in what, held in flat arrays.
+
+    People and movies are numbered in file order. Their numeric ids are
+    interned as ints, with a sorted copy for lookup; names and titles are
+    concatenated UTF-8 with an offset table, and missing birth years are
+    stored as -1. person_name_order lists the people sorted by lowercase
+    name, for exact name lookups. The movies of person i are the sorted movie numbers
+    person_movies[person_movies_offsets[i]:person_movies_offsets[i + 1]],
+    and the stars of each movie are stored the same way.
+    """
+
+    FIELDS = (
+        "person_keys", "person_sorted_keys", "person_order",
+        "person_name_offsets", "person_names", "person_births", "person_name_order",
+        "movie_keys", "movie_sorted_keys", "movie_order",
+        "movie_title_offsets", "movie_titles", "movie_years",
+        "person_movies_offsets", "person_movies",
+        "movie_stars_offsets", "movie_stars"
+    )
+
+    def __init__(self, sections):
+        """
+        Wrap a dict of arrays (or memoryviews) keyed by FIELDS.
+        """
+        self.sections = sections
+        for field in self.FIELDS:
+            setattr(self, field, sections[field])
+        self.person_ids = IdTable(self.person_keys)
+        self.movie_ids = IdTable(self.movie_keys)
+        self.person_index = IdIndex(self.person_sorted_keys, self.person_order)
+        self.movie_index = IdIndex(self.movie_sorted_keys, self.movie_order)
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load the dataset in `directory`, reading each CSV file a row at a
+        time. Ids must be plain integers.
+        """
+        sections = dict()
+
+        # Load people
+        keys, name_offsets, names, births = array("q"), array("q", [0]), bytearray(), array("i")
+        lowered = []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for person_id, name, birth in rows(f):
+                keys.append(parse_id(person_id))
+                names += name.encode("utf-8")
+                name_offsets.append(len(names))
+                births.append(int(birth) if birth else -1)
+                lowered.append(name.lower())
+        sections.update(index_keys("person", keys))
+        sections.update(person_name_offsets=name_offsets, person_names=names, person_births=births)
+        sections["person_name_order"] = array("i", sorted(range(len(lowered)), key=lowered.__getitem__))
+        del lowered
+
+        # Load movies
+        keys, title_offsets, titles, years = array("q"), array("q", [0]), bytearray(), array("i")
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for movie_id, title, year in rows(f):
+                keys.append(parse_id(movie_id))
+                titles += title.encode("utf-8")
+                title_offsets.append(len(titles))
+                years.append(int(year) if year else -1)
+        sections.update(index_keys("movie", keys))
+        sections.update(movie_title_offsets=title_offsets, movie_titles=titles, movie_years=years)
+
+        # Load stars, skipping rows that name unknown people or movies
+        person_index = IdIndex(sections["person_sorted_keys"], sections["person_order"])
+        movie_index = IdIndex(sections["movie_sorted_keys"], sections["movie_order"])
+        star_people, star_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for person_id, movie_id in rows(f):
+                person = person_index.find(person_id)
+                movie = movie_index.find(movie_id)
+                if person is not None and movie is not None:
+                    star_people.append(person)
+                    star_movies.append(movie)
+
+        offsets, values = group(star_people, star_movies, len(sections["person_keys"]))
+        sections.update(person_movies_offsets=offsets, person_movies=values)
+        offsets, values = group(star_movies, star_people, len(sections["movie_keys"]))
+        sections.update(movie_stars_offsets=offsets, movie_stars=values)
+        return cls(sections)
+
+    def name(self, person):
+        return str(self.person_names[self.person_name_offsets[person]:self.person_name_offsets[person + 1]], "utf-8")
+
+    def people_named(self, name):
+        """
+        Returns the numbers of the people called `name`, ignoring case,
+        by binary search over person_name_order.
+        """
+        key = name.lower()
+        order = self.person_name_order
+        i = bisect_left(order, key, key=lambda person: self.name(person).lower())
+        matches = []
+        while i < len(order) and self.name(order[i]).lower() == key:
+            matches.append(order[i])
+            i += 1
+        return matches
+
+    def birth(self, person):
+        birth = self.person_births[person]
+        return str(birth) if birth >= 0 else ""
+
+    def title(self, movie):
+        return str(self.movie_titles[self.movie_title_offsets[movie]:self.movie_title_offsets[movie + 1]], "utf-8")
+
+    def year(self, movie):
+        year = self.movie_years[movie]
+        return str(year) if year >= 0 else ""
+
+    def movies_of(self, person):
+        return self.person_movies[self.person_movies_offsets[person]:self.person_movies_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        return self.movie_stars[self.movie_stars_offsets[movie]:self.movie_stars_offsets[movie + 1]]
+
+
+class IdTable():
+    """
+    Sequence of string ids over an array of interned int ids.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        return str(self.keys[i])
+
+
+class IdIndex(Mapping):
+    """
+    Read-only mapping from string ids to their position in load order,
+    found by binary search over the sorted interned ids.
+    """
+
+    def __init__(self, sorted_keys, order):
+        self.sorted_keys = sorted_keys
+        self.order = order
+
+    def find(self, key):
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self.sorted_keys, key)
+        if i < len(self.sorted_keys) and self.sorted_keys[i] == key:
+            return self.order[i]
+        return None
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i is None:
+            raise KeyError(key)
+        return i
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def __iter__(self):
+        keys = [None] * len(self.order)
+        for key, i in zip(self.sorted_keys, self.order):
+            keys[i] = str(key)
+        return iter(keys)
+
+    def __len__(self):
+        return len(self.order)
+
+
+class PersonRecord():
+    """
+    One person of a CompactData, read like the dicts in degrees.people.
+    Fields are decoded only when asked for.
+    """
+    __slots__ = ("data", "person")
+
+    def __init__(self, data, person):
+        self.data = data
+        self.person = person
+
+    def __getitem__(self, field):
+        if field == "name":
+            return self.data.name(self.person)
+        if field == "birth":
+            return self.data.birth(self.person)
+        if field == "movies":
+            return {self.data.movie_ids[m] for m in self.data.movies_of(self.person)}
+        raise KeyError(field)
+
+
+class MovieRecord():
+    """
+    One movie of a CompactData, read like the dicts in degrees.movies.
+    Fields are decoded only when asked for.
+    """
+    __slots__ = ("data", "movie")
+
+    def __init__(self, data, movie):
+        self.data = data
+        self.movie = movie
+
+    def __getitem__(self, field):
+        if field == "title":
+            return self.data.title(self.movie)
+        if field == "year":
+            return self.data.year(self.movie)
+        if field == "stars":
+            return {self.data.person_ids[p] for p in self.data.stars_of(self.movie)}
+        raise KeyError(field)
+
+
+class RecordView(Mapping):
+    """
+    Read-only mapping from string ids to records, standing in for the
+    degrees.people or degrees.movies dict.
+    """
+
+    def __init__(self, data, ids, index, record):
+        self.data = data
+        self.ids = ids
+        self.index = index
+        self.record = record
+
+    def __getitem__(self, key):
+        return self.record(self.data, self.index[key])
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return (self.ids[i] for i in range(len(self.ids)))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class NameTable(Mapping):
+    """
+    Read-only mapping from lowercase names to sets of person_ids, standing
+    in for the degrees.names dict. Names are looked up by binary search
+    in the CompactData, so no strings are kept in memory.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getitem__(self, name):
+        people = self.data.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.data.person_ids[person] for person in people}
+
+    def __iter__(self):
+        previous = None
+        for person in self.data.person_name_order:
+            key = self.data.name(person).lower()
+            if key != previous:
+                yield key
+                previous = key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def names_view(data):
+    return NameTable(data)
+
+
+def people_view(data):
+    return RecordView(data, data.person_ids, data.person_index, PersonRecord)
+
+
+def movies_view(data):
+    return RecordView(data, data.movie_ids, data.movie_index, MovieRecord)
+
+
+def rows(f):
+    """
+    Yields the rows of an open CSV file after its header, skipping blank
+    lines as csv.DictReader does.
+    """
+    reader = csv.reader(f)
+    next(reader)
+    return (row for row in reader if row)
+
+
+def parse_id(text):
+    """
+    Interns an id as an int, refusing ids that would not read back the
+    same (such as ones with leading zeros).
+    """
+    key = int(text)
+    if str(key) != text:
+        raise ValueError(f"compact loading needs plain integer ids, got {text!r}")
+    return key
+
+
+def index_keys(prefix, keys):
+    """
+    Returns the `keys` section for `prefix` along with a sorted copy and
+    the load order position of each sorted key.
+    """
+    order = array("i", sorted(range(len(keys)), key=keys.__getitem__))
+    return {
+        f"{prefix}_keys": keys,
+        f"{prefix}_sorted_keys": array("q", (keys[i] for i in order)),
+        f"{prefix}_order": order
+    }
+
+
+def group(rows, values, count):
+    """
+    Counting sort of (rows[i], values[i]) pairs into CSR form with `count`
+    rows, each row's values sorted and without duplicates.
+    """
+    offsets = array("q", [0]) * (count + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for row in range(count):
+        offsets[row + 1] += offsets[row]
+
+    grouped = array("i", bytes(4 * len(values)))
+    position = offsets[:-1]
+    for row, value in zip(rows, values):
+        grouped[position[row]] = value
+        position[row] += 1
+
+    # Sort each row and drop repeated stars rows in place
+    end = 0
+    for row in range(count):
+        unique = sorted(set(grouped[offsets[row]:offsets[row + 1]]))
+        offsets[row] = end
+        grouped[end:end + len(unique)] = array("i", unique)
+        end += len(unique)
+    offsets[count] = end
+    del grouped[end:]
+    return offsets, grouped
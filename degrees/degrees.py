@@ -1,7 +1,12 @@
 import csv
 import sys
+from array import array
 
-from util import Node, StackFrontier, QueueFrontier
+import compact
+import snapshot
+from graph import CoStarGraph, UNKNOWN, ALLOWED, REJECTED
+from nameindex import NameIndex, choose
+from util import Node, StackFrontier, DequeQueueFrontier, LRUCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +17,89 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed adjacency over people and movies, built by load_data(index=True)
+graph = None
 
-def load_data(directory):
+
+def path_size(path):
+    return sys.getsizeof(path) + 64 * len(path or ())
+
+
+def tree_size(tree):
+    return sys.getsizeof(tree[0]) + 28 * len(tree[0])
+
+
+# How many people the most recent dict-based search expanded
+nodes_expanded = 0
+
+# Release year of each movie number in `graph` (-1 if unknown), and the
+# movie numbers released in each year, built by the first constrained search
+movie_years = None
+movies_by_year = None
+
+# Prefix and fuzzy index over `people` names, built on first use
+name_index = None
+
+# Answers to recent (source, target) queries, paths or None
+path_cache = LRUCache(maxsize=100000, maxbytes=64 * 2 ** 20, sizeof=path_size)
+
+# Breadth-first search trees over `graph` by source person_id, as
+# (parents, complete) where incomplete trees stopped early
+tree_cache = LRUCache(maxbytes=256 * 2 ** 20, sizeof=tree_size)
+
+
+def load_data(directory, index=False, cache=False, compact_data=False):
     """
     Load data from CSV files into memory.
+
+    If `index` is true, also build the integer-indexed co-star graph
+    that the search functions use in place of the dicts.
+
+    If `cache` is true, the data and index are read from a binary snapshot
+    next to the CSV files when one exists for their current contents, and
+    a new snapshot is written otherwise.
+
+    If `compact_data` is true, the data is kept in flat arrays (see
+    compact.CompactData) and `names`, `people` and `movies` become
+    read-only views over them that look up records on demand.
     """
+    global names, people, movies, graph, name_index, movie_years, movies_by_year
+
+    name_index = None
+    movie_years = movies_by_year = None
+    path_cache.clear()
+    tree_cache.clear()
+
+    if compact_data:
+        loaded = snapshot.load_compact(directory) if cache else None
+        if loaded is None:
+            data = compact.CompactData.from_csv(directory)
+            graph = CoStarGraph.from_compact(data) if index or cache else None
+            if cache:
+                try:
+                    snapshot.save_compact(directory, data, graph)
+                except OSError:
+                    pass
+        else:
+            data, graph = loaded
+        names = compact.names_view(data)
+        people = compact.people_view(data)
+        movies = compact.movies_view(data)
+        return
+    if not isinstance(people, dict):
+        names, people, movies = {}, {}, {}
+
+    if cache:
+        loaded = snapshot.load(directory, connections)
+        if loaded is not None:
+            people.update(loaded[0])
+            movies.update(loaded[1])
+            graph, name_index = loaded[2], loaded[3]
+            starts = name_index.starts
+            for position, key in enumerate(name_index.keys):
+                names[key] = set(name_index.person_ids[starts[position]:starts[position + 1]])
+            return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,6 +134,13 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    graph = CoStarGraph.from_data(people, movies) if index or cache else None
+    if cache:
+        try:
+            snapshot.save(directory, people, movies, graph, get_name_index())
+        except OSError:
+            pass
+
 
 def main():
     if len(sys.argv) > 2:
@@ -59,7 +149,11 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    try:
+        load_data(directory, cache=True, compact_data=True)
+    except ValueError:
+        # Compact loading needs plain integer ids and well-formed rows
+        load_data(directory, cache=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +163,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = bidirectional_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -90,9 +184,15 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    global nodes_expanded
+    if graph is not None:
+        return graph.shortest_path(source, target)
+
+    nodes_expanded = 0
+
     # Create a new frontier and explored set
     explored = set()
-    frontier = QueueFrontier() # Creates new empty frontier
+    frontier = DequeQueueFrontier() # Creates new empty frontier
     start = Node(source, None, None) # Creates a node with the source as the state, None as the parent, and None as the action)
     frontier.add(start) # Adds the start node to the frontier
 
@@ -104,6 +204,7 @@ def shortest_path(source, target):
         # 2 & 4. Remove a node from the frontier and add it to the explored set
         current_node = frontier.remove()
         explored.add(current_node.state)
+        nodes_expanded += 1
 
         # 3. goal test 
         if (current_node.state == target):
@@ -115,6 +216,228 @@ def shortest_path(source, target):
                 new_node = Node(action[1], current_node, action[0])
                 frontier.add(new_node)
                 
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing one frontier
+    from each end and stopping when they meet in the middle.
+
+    If no possible path, returns None.
+    """
+    global nodes_expanded
+    if graph is not None:
+        return graph.bidirectional_path(source, target)
+    nodes_expanded = 0
+    if source == target:
+        return []
+
+    # Maps each reached person to the (person_id, movie_id) it was reached
+    # from, pointing back towards the source or the target respectively
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        # Always grow the smaller frontier by one whole layer
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meetings = expand_layer(forward_layer, forward, backward)
+        else:
+            backward_layer, meetings = expand_layer(backward_layer, backward, forward)
+
+        # Every meeting in a layer shares its depth on the side just expanded,
+        # so the shortest path goes through the one closest to the other end
+        if meetings:
+            meeting = min(meetings, key=lambda person_id: (
+                chain_length(forward, person_id) + chain_length(backward, person_id)
+            ))
+            return join_paths(forward, backward, meeting)
+    return None
+
+
+def cached_shortest_path(source, target):
+    """
+    Returns the same answer as bidirectional_shortest_path, reusing
+    earlier answers between the same two people (in either direction)
+    and cached search trees rooted at either of them.
+
+    With a co-star index, a search that no cached tree answers grows a
+    breadth-first tree from the source until it reaches the target, and
+    keeps that tree for later queries from or to the same person.
+    """
+    missing = object()
+    path = path_cache.get((source, target), missing, count=False)
+    if path is missing:
+        path = path_cache.get((target, source), missing, count=False)
+        if path is not missing:
+            path = reverse_path(target, path)
+    path_cache.record(path is not missing)
+    if path is not missing:
+        return path
+
+    if graph is not None:
+        for root, other in ((source, target), (target, source)):
+            tree = tree_cache.get(root, count=False)
+            if tree is None:
+                continue
+            parents, complete = tree
+            node = graph.person_index[other]
+            if node in parents:
+                if root == source:
+                    path = graph.path_to(parents, node)
+                else:
+                    path = graph.path_from(parents, node)
+                break
+            if complete:
+                path = None
+                break
+        tree_cache.record(path is not missing)
+        if path is missing:
+            goal = graph.person_index[target]
+            parents = graph.bfs_tree(graph.person_index[source], {goal})
+            tree_cache.put(source, (parents, goal not in parents))
+            path = graph.path_to(parents, goal) if goal in parents else None
+    else:
+        path = bidirectional_shortest_path(source, target)
+
+    path_cache.put((source, target), path)
+    return path
+
+
+def reverse_path(source, path):
+    """
+    Turns a path from `source` into the same path walked backwards.
+    """
+    if path is None:
+        return None
+    people_on_path = [source] + [person_id for _, person_id in path]
+    return [
+        (path[i][0], people_on_path[i])
+        for i in range(len(path) - 1, -1, -1)
+    ]
+
+
+def constrained_shortest_path(source, target, years=None, exclude_movies=(),
+                              movie_filter=None, person_filter=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect
+    the source to the target using only movies released in `years` (an
+    inclusive (first, last) pair, either end of which may be None), not in
+    `exclude_movies`, and for which `movie_filter(movie_id)` is true, and
+    passing only through people for which `person_filter(person_id)` is
+    true. The filters are only called for movies and people the search
+    reaches.
+
+    If no possible path, returns None. Needs load_data(index=True).
+    """
+    if graph is None:
+        raise ValueError("constrained searches need load_data(index=True)")
+    build_year_index()
+
+    movie_ids = graph.movie_ids
+    person_ids = graph.person_ids
+    if years is None:
+        first, last = -1, sys.maxsize
+    else:
+        first = 0 if years[0] is None else years[0]
+        last = sys.maxsize if years[1] is None else years[1]
+    in_window = [year for year in movies_by_year if first <= year <= last]
+
+    # A narrow window starts with every movie rejected and lets in the
+    # movies of each year in it; a wide one checks years as it goes
+    narrow = sum(len(movies_by_year[year]) for year in in_window) * 2 < len(movie_ids)
+    if narrow:
+        movie_states = bytearray([REJECTED]) * len(movie_ids)
+        state = UNKNOWN if movie_filter is not None else ALLOWED
+        for year in in_window:
+            for movie in movies_by_year[year]:
+                movie_states[movie] = state
+    else:
+        movie_states = bytearray(len(movie_ids))
+    for movie_id in exclude_movies:
+        movie_states[graph.movie_index[movie_id]] = REJECTED
+
+    def movie_allowed(movie):
+        if not narrow and not first <= movie_years[movie] <= last:
+            return False
+        return movie_filter is None or movie_filter(movie_ids[movie])
+
+    def person_allowed(node):
+        return person_filter(person_ids[node])
+
+    return graph.constrained_path(
+        source, target, movie_allowed,
+        person_allowed if person_filter is not None else None,
+        movie_states
+    )
+
+
+def build_year_index():
+    """
+    Fills in `movie_years` and `movies_by_year` for the current graph.
+    """
+    global movie_years, movies_by_year
+    if movie_years is not None:
+        return
+    movie_years = array("i")
+    movies_by_year = dict()
+    for movie, movie_id in enumerate(graph.movie_ids):
+        year = movies[movie_id]["year"]
+        year = int(year) if year.isdigit() else -1
+        movie_years.append(year)
+        movies_by_year.setdefault(year, array("i")).append(movie)
+
+
+def expand_layer(layer, parents, other):
+    """
+    Expands every person in `layer`, recording newly reached people in
+    `parents`. Returns the next layer and the people in it that the
+    opposite search (`other`) has already reached.
+    """
+    global nodes_expanded
+    nodes_expanded += len(layer)
+    next_layer = []
+    meetings = []
+    for person_id in layer:
+        for movie_id, neighbor_id in neighbors_for_person(person_id):
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (person_id, movie_id)
+            next_layer.append(neighbor_id)
+            if neighbor_id in other:
+                meetings.append(neighbor_id)
+    return next_layer, meetings
+
+
+def chain_length(parents, person_id):
+    length = 0
+    while parents[person_id] is not None:
+        person_id = parents[person_id][0]
+        length += 1
+    return length
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Joins the source half and the target half of a bidirectional search
+    at `meeting` into a list of (movie_id, person_id) pairs.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        parent_id, movie_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        next_id, movie_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
+
+
 # returns list of tuples (movie_id, person_id)
 def get_full_path(node):
     path = list()
@@ -125,11 +448,17 @@ def get_full_path(node):
         currNode = currNode.parent
     return path[::-1]
 
-def person_id_for_name(name):    
+def person_id_for_name(name, policy=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    By default the user is asked which person they meant. If `policy`
+    names one of nameindex.POLICIES, it picks instead without prompting.
     """
+    if policy is not None:
+        return choose(person_ids_for_name(name), policy, people, connections)
+
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
@@ -151,6 +480,34 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_name(name):
+    """
+    Returns the sorted person_ids of everyone called `name`, ignoring case.
+    """
+    return sorted(names.get(name.lower(), ()))
+
+
+def get_name_index():
+    """
+    Returns the name index over `people`, building it the first time.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex(people, connections)
+    return name_index
+
+
+def connections(person_id):
+    """
+    Returns how many co-star links a person has, or how many movies they
+    starred in when there is no co-star index.
+    """
+    if graph is not None:
+        node = graph.person_index[person_id]
+        return graph.offsets[node + 1] - graph.offsets[node]
+    return len(people[person_id]["movies"])
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
@@ -0,0 +1,317 @@
+from array import array
+from bisect import bisect_right
+
+# States of a movie or person in a constrained search, where predicates
+# are only evaluated the first time the search meets each one
+UNKNOWN = 0
+ALLOWED = 1
+REJECTED = 2
+
+
+class CoStarGraph():
+    """
+    Integer-indexed co-star graph stored in compressed sparse row form.
+
+    People are numbered 0..n-1 in load order and movies likewise. The
+    co-stars of person i are neighbors[offsets[i]:offsets[i + 1]], and the
+    movie they share with i sits at the same position of `via`.
+    """
+
+    def __init__(self, person_ids, movie_ids, offsets, neighbors, via,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.via = via
+
+        # How many people the most recent search expanded
+        self.nodes_expanded = 0
+
+    @classmethod
+    def from_data(cls, people, movies):
+        """
+        Build the graph from the `people` and `movies` dicts filled in
+        by load_data.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        offsets = array("q", [0])
+        neighbors = array("i")
+        via = array("i")
+        for person_id in person_ids:
+            for movie_id in people[person_id]["movies"]:
+                movie = movie_index[movie_id]
+                for star_id in movies[movie_id]["stars"]:
+                    if star_id != person_id:
+                        neighbors.append(person_index[star_id])
+                        via.append(movie)
+            offsets.append(len(neighbors))
+        return cls(person_ids, movie_ids, offsets, neighbors, via, person_index, movie_index)
+
+    @classmethod
+    def from_compact(cls, data):
+        """
+        Build the graph from a compact.CompactData, sharing its id tables.
+        """
+        offsets = array("q", [0])
+        neighbors = array("i")
+        via = array("i")
+        for person in range(len(data.person_ids)):
+            for movie in data.movies_of(person):
+                for star in data.stars_of(movie):
+                    if star != person:
+                        neighbors.append(star)
+                        via.append(movie)
+            offsets.append(len(neighbors))
+        return cls(
+            data.person_ids, data.movie_ids, offsets, neighbors, via,
+            data.person_index, data.movie_index
+        )
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def owner(self, edge):
+        """
+        Returns the person whose adjacency row contains `edge`.
+        """
+        return bisect_right(self.offsets, edge) - 1
+
+    def shortest_path(self, source, target):
+        """
+        Breadth-first search from `source` to `target` (IMDb person ids).
+        Returns the shortest list of (movie_id, person_id) pairs, or None.
+        """
+        start = self.person_index[source]
+        goal = self.person_index[target]
+        self.nodes_expanded = 0
+        if start == goal:
+            return []
+
+        offsets, neighbors = self.offsets, self.neighbors
+
+        # Maps each reached person to the edge it was reached through
+        parents = {start: -1}
+        layer = [start]
+        while layer:
+            next_layer = []
+            for node in layer:
+                self.nodes_expanded += 1
+                begin = offsets[node]
+                for edge, neighbor in enumerate(neighbors[begin:offsets[node + 1]], begin):
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = edge
+                    if neighbor == goal:
+                        return self.path_to(parents, goal)
+                    next_layer.append(neighbor)
+            layer = next_layer
+        return None
+
+    def bfs_tree(self, start, goals=None):
+        """
+        Breadth-first search outwards from person `start` (a node number).
+
+        Returns a dict mapping every reached node to the edge it was
+        reached through (-1 for `start`), for use with path_to. If `goals`
+        is given, the search stops as soon as all of them are reached.
+        """
+        offsets, neighbors = self.offsets, self.neighbors
+        remaining = set(goals) - {start} if goals is not None else None
+
+        self.nodes_expanded = 0
+        parents = {start: -1}
+        layer = [start]
+        while layer and remaining != set():
+            self.nodes_expanded += len(layer)
+            next_layer = []
+            for node in layer:
+                begin = offsets[node]
+                for edge, neighbor in enumerate(neighbors[begin:offsets[node + 1]], begin):
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = edge
+                    next_layer.append(neighbor)
+                    if remaining:
+                        remaining.discard(neighbor)
+            layer = next_layer
+        return parents
+
+    def bidirectional_path(self, source, target):
+        """
+        Bidirectional breadth-first search from `source` to `target`
+        (IMDb person ids), always growing the smaller frontier by one
+        layer. Returns the shortest list of (movie_id, person_id) pairs,
+        or None.
+        """
+        start = self.person_index[source]
+        goal = self.person_index[target]
+        self.nodes_expanded = 0
+        if start == goal:
+            return []
+
+        forward = {start: -1}
+        backward = {goal: -1}
+        forward_layer = [start]
+        backward_layer = [goal]
+        while forward_layer and backward_layer:
+            if len(forward_layer) <= len(backward_layer):
+                forward_layer, meetings = self.expand_layer(forward_layer, forward, backward)
+            else:
+                backward_layer, meetings = self.expand_layer(backward_layer, backward, forward)
+            if meetings:
+                meeting = min(meetings, key=lambda node: (
+                    self.depth(forward, node) + self.depth(backward, node)
+                ))
+                return self.path_to(forward, meeting) + self.path_from(backward, meeting)
+        return None
+
+    def constrained_path(self, source, target, movie_allowed=None, person_allowed=None,
+                         movie_states=None):
+        """
+        Bidirectional search like bidirectional_path, using only movies
+        for which `movie_allowed(movie)` is true and passing only through
+        people for which `person_allowed(node)` is true. Both predicates
+        take numbers rather than IMDb ids and are evaluated lazily, once
+        per movie or person the search meets. The source and target are
+        always allowed.
+
+        `movie_states` optionally gives a bytearray of known movie states
+        (see UNKNOWN, ALLOWED and REJECTED), which is updated in place.
+        """
+        start = self.person_index[source]
+        goal = self.person_index[target]
+        self.nodes_expanded = 0
+        if start == goal:
+            return []
+
+        if movie_states is None:
+            movie_states = bytearray(len(self.movie_ids))
+        person_states = bytearray(len(self)) if person_allowed is not None else None
+        checks = (movie_states, movie_allowed, person_states, person_allowed)
+
+        forward = {start: -1}
+        backward = {goal: -1}
+        forward_layer = [start]
+        backward_layer = [goal]
+        while forward_layer and backward_layer:
+            if len(forward_layer) <= len(backward_layer):
+                forward_layer, meetings = self.expand_layer_constrained(
+                    forward_layer, forward, backward, *checks
+                )
+            else:
+                backward_layer, meetings = self.expand_layer_constrained(
+                    backward_layer, backward, forward, *checks
+                )
+            if meetings:
+                meeting = min(meetings, key=lambda node: (
+                    self.depth(forward, node) + self.depth(backward, node)
+                ))
+                return self.path_to(forward, meeting) + self.path_from(backward, meeting)
+        return None
+
+    def expand_layer_constrained(self, layer, parents, other,
+                                 movie_states, movie_allowed, person_states, person_allowed):
+        """
+        expand_layer for constrained_path, skipping edges through rejected
+        movies or to rejected people.
+        """
+        offsets, neighbors, via = self.offsets, self.neighbors, self.via
+        self.nodes_expanded += len(layer)
+        next_layer = []
+        meetings = []
+        for node in layer:
+            begin = offsets[node]
+            for edge, neighbor in enumerate(neighbors[begin:offsets[node + 1]], begin):
+                if neighbor in parents:
+                    continue
+
+                movie = via[edge]
+                state = movie_states[movie]
+                if state == UNKNOWN:
+                    state = ALLOWED if movie_allowed is None or movie_allowed(movie) else REJECTED
+                    movie_states[movie] = state
+                if state == REJECTED:
+                    continue
+
+                # People the other side reached were already checked by it
+                if person_states is not None and neighbor not in other:
+                    state = person_states[neighbor]
+                    if state == UNKNOWN:
+                        state = ALLOWED if person_allowed(neighbor) else REJECTED
+                        person_states[neighbor] = state
+                    if state == REJECTED:
+                        continue
+
+                parents[neighbor] = edge
+                next_layer.append(neighbor)
+                if neighbor in other:
+                    meetings.append(neighbor)
+        return next_layer, meetings
+
+    def expand_layer(self, layer, parents, other):
+        """
+        Expands every person in `layer`, recording the edge each newly
+        reached person came through in `parents`. Returns the next layer
+        and the people in it already reached by the opposite search.
+        """
+        offsets, neighbors = self.offsets, self.neighbors
+        self.nodes_expanded += len(layer)
+        next_layer = []
+        meetings = []
+        for node in layer:
+            begin = offsets[node]
+            for edge, neighbor in enumerate(neighbors[begin:offsets[node + 1]], begin):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = edge
+                next_layer.append(neighbor)
+                if neighbor in other:
+                    meetings.append(neighbor)
+        return next_layer, meetings
+
+    def depth(self, parents, node):
+        depth = 0
+        while parents[node] != -1:
+            node = self.owner(parents[node])
+            depth += 1
+        return depth
+
+    def path_to(self, parents, node):
+        """
+        Returns the (movie_id, person_id) pairs leading from the root of
+        `parents` to `node`.
+        """
+        path = []
+        while parents[node] != -1:
+            edge = parents[node]
+            path.append((self.movie_ids[self.via[edge]], self.person_ids[node]))
+            node = self.owner(edge)
+        path.reverse()
+        return path
+
+    def path_from(self, parents, node):
+        """
+        Returns the (movie_id, person_id) pairs leading from `node` back
+        to the root of `parents`.
+        """
+        path = []
+        while parents[node] != -1:
+            edge = parents[node]
+            node = self.owner(edge)
+            path.append((self.movie_ids[self.via[edge]], self.person_ids[node]))
+        return path
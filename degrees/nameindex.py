@@ -0,0 +1,160 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Most names scored by Jaccard similarity in one fuzzy lookup
+FUZZY_CANDIDATES = 500
+
+
+class NameIndex():
+    """
+    Index over people's names for exact, prefix and fuzzy lookup.
+
+    Distinct lowercase names are kept sorted in `keys`, so prefix lookups
+    are a binary search. The people sharing keys[i] are
+    person_ids[starts[i]:starts[i + 1]]. Fuzzy lookups go through a
+    trigram index mapping each trigram to the keys containing it, built
+    the first time one is made.
+    """
+
+    def __init__(self, people, connections):
+        """
+        Build the index from the `people` dict loaded by degrees.load_data.
+        `connections(person_id)` tells how connected a person is, for the
+        "most_connected" policy.
+        """
+        by_name = dict()
+        for person_id, person in people.items():
+            by_name.setdefault(person["name"].lower(), []).append(person_id)
+
+        self.people = people
+        self.connections = connections
+        self.keys = sorted(by_name)
+        self.starts = array("q", [0])
+        self.person_ids = []
+        for key in self.keys:
+            self.person_ids.extend(by_name[key])
+            self.starts.append(len(self.person_ids))
+
+        # Built by the first fuzzy lookup
+        self.trigram_index = None
+
+    @classmethod
+    def from_sorted(cls, people, connections, keys, starts, person_ids):
+        """
+        Rebuild an index from the `keys`, `starts` and `person_ids` of one
+        saved earlier, without grouping and sorting the names again.
+        """
+        index = cls.__new__(cls)
+        index.people = people
+        index.connections = connections
+        index.keys = keys
+        index.starts = starts
+        index.person_ids = person_ids
+        index.trigram_index = None
+        return index
+
+    def build_trigram_index(self):
+        """
+        Maps each trigram to the positions of the keys containing it.
+        """
+        self.trigram_index = dict()
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.trigram_index.setdefault(trigram, array("i")).append(position)
+
+    def exact(self, name):
+        """
+        Returns the person_ids of everyone called `name`.
+        """
+        key = name.lower()
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.person_ids[self.starts[position]:self.starts[position + 1]]
+        return []
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` person_ids whose names start with `text`,
+        in alphabetical order of name.
+        """
+        key = text.lower()
+        matches = []
+        position = bisect_left(self.keys, key)
+        while (position < len(self.keys) and len(matches) < limit and
+               self.keys[position].startswith(key)):
+            matches.extend(self.person_ids[self.starts[position]:self.starts[position + 1]])
+            position += 1
+        return matches[:limit]
+
+    def fuzzy(self, text, limit=10):
+        """
+        Returns up to `limit` person_ids whose names are most similar to
+        `text`, by Jaccard similarity of their trigrams.
+        """
+        query = trigrams(text.lower())
+        if not query:
+            return []
+        if self.trigram_index is None:
+            self.build_trigram_index()
+
+        # A name sharing at least half of the query's trigrams must share one
+        # of its rarest len // 2 + 1, so only those posting lists are read
+        postings = sorted(
+            (self.trigram_index.get(trigram, ()) for trigram in query), key=len
+        )
+        candidates = Counter()
+        for posting in postings[:len(postings) // 2 + 1]:
+            candidates.update(posting)
+
+        # Only the names sharing the most of those trigrams are scored
+        scores = []
+        for position, _ in candidates.most_common(FUZZY_CANDIDATES):
+            found = trigrams(self.keys[position])
+            scores.append((len(query & found) / len(query | found), -position))
+        matches = []
+        for _, position in heapq.nlargest(limit, scores):
+            begin, end = self.starts[-position], self.starts[-position + 1]
+            matches.extend(self.person_ids[begin:end])
+        return matches[:limit]
+
+    def lookup(self, name, policy="most_connected"):
+        """
+        Returns the person_id for `name`, choosing among people with the
+        same name by `policy` (a key of POLICIES), or None if nobody has
+        that name.
+        """
+        return choose(self.exact(name), policy, self.people, self.connections)
+
+
+def trigrams(text):
+    """
+    Returns the set of trigrams of `text`, padded so that short names and
+    word boundaries still produce some.
+    """
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def choose(person_ids, policy, people, connections):
+    """
+    Returns whichever of `person_ids` ranks first by `policy` (a key of
+    POLICIES), or None if there are none. `people` and `connections` are
+    as given to NameIndex.
+    """
+    if not person_ids:
+        return None
+    return min(person_ids, key=lambda person_id: POLICIES[policy](people, connections, person_id))
+
+
+def birth_year(people, connections, person_id):
+    birth = people[person_id]["birth"]
+    return (0, int(birth)) if birth.isdigit() else (1, 0)
+
+
+# Sort keys ranking people who share a name, best first
+POLICIES = {
+    "most_connected": lambda people, connections, person_id: -connections(person_id),
+    "earliest_birth": birth_year
+}
@@ -0,0 +1,242 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from compact import CompactData
+from graph import CoStarGraph
+from nameindex import NameIndex
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 4
+# Each kind of snapshot has its own file, so loading one kind never
+# replaces the other
+FILENAMES = {"dicts": "degrees.snapshot", "compact": "degrees.compact.snapshot"}
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Magic, format version and length of the JSON metadata that follows
+HEADER = struct.Struct("<8sII")
+
+
+def snapshot_path(directory, kind):
+    return os.path.join(directory, FILENAMES[kind])
+
+
+def source_stats(directory):
+    """
+    Returns the size and modification time of each CSV file, which a
+    snapshot must match to be reused.
+    """
+    stats = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def save(directory, people, movies, graph, name_index):
+    """
+    Write a binary snapshot of the loaded dicts, co-star graph and
+    nameindex.NameIndex next to the CSV files.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+    # Which movies each person starred in, and who starred in each movie
+    person_movies_offsets = array("q", [0])
+    person_movies = array("i")
+    for person_id in person_ids:
+        person_movies.extend(movie_index[m] for m in people[person_id]["movies"])
+        person_movies_offsets.append(len(person_movies))
+    movie_stars_offsets = array("q", [0])
+    movie_stars = array("i")
+    for movie_id in movie_ids:
+        movie_stars.extend(graph.person_index[p] for p in movies[movie_id]["stars"])
+        movie_stars_offsets.append(len(movie_stars))
+
+    sections = {
+        "person_ids": person_ids,
+        "person_names": [people[p]["name"] for p in person_ids],
+        "person_births": [people[p]["birth"] for p in person_ids],
+        "movie_ids": movie_ids,
+        "movie_titles": [movies[m]["title"] for m in movie_ids],
+        "movie_years": [movies[m]["year"] for m in movie_ids],
+        "person_movies_offsets": person_movies_offsets,
+        "person_movies": person_movies,
+        "movie_stars_offsets": movie_stars_offsets,
+        "movie_stars": movie_stars,
+        "offsets": graph.offsets,
+        "neighbors": graph.neighbors,
+        "via": graph.via,
+        "name_keys": name_index.keys,
+        "name_starts": name_index.starts,
+        "name_people": array("i", (graph.person_index[p] for p in name_index.person_ids)),
+    }
+
+    write(directory, "dicts", sections)
+
+
+def load(directory, connections):
+    """
+    Memory-map the snapshot for `directory`.
+
+    Returns (people, movies, graph, name_index), or None if there is no
+    snapshot or it was written by another format version or from
+    different CSV files. The graph's arrays are views straight into the
+    mapped file. `connections` is passed on to the NameIndex.
+    """
+    sections = read(directory, "dicts")
+    if sections is None:
+        return None
+
+    person_ids = sections["person_ids"]
+    movie_ids = sections["movie_ids"]
+    person_movies_offsets = sections["person_movies_offsets"]
+    person_movies = sections["person_movies"]
+    movie_stars_offsets = sections["movie_stars_offsets"]
+    movie_stars = sections["movie_stars"]
+
+    people = {}
+    for i, person_id in enumerate(person_ids):
+        begin, end = person_movies_offsets[i], person_movies_offsets[i + 1]
+        people[person_id] = {
+            "name": sections["person_names"][i],
+            "birth": sections["person_births"][i],
+            "movies": {movie_ids[m] for m in person_movies[begin:end]}
+        }
+    movies = {}
+    for i, movie_id in enumerate(movie_ids):
+        begin, end = movie_stars_offsets[i], movie_stars_offsets[i + 1]
+        movies[movie_id] = {
+            "title": sections["movie_titles"][i],
+            "year": sections["movie_years"][i],
+            "stars": {person_ids[p] for p in movie_stars[begin:end]}
+        }
+
+    graph = CoStarGraph(
+        person_ids, movie_ids,
+        sections["offsets"], sections["neighbors"], sections["via"]
+    )
+    name_index = NameIndex.from_sorted(
+        people, connections, sections["name_keys"], sections["name_starts"],
+        [person_ids[p] for p in sections["name_people"]]
+    )
+    return people, movies, graph, name_index
+
+
+def save_compact(directory, data, graph=None):
+    """
+    Write a snapshot of a compact.CompactData, and of the co-star graph
+    built from it if there is one.
+    """
+    sections = dict(data.sections)
+    if graph is not None:
+        sections.update(offsets=graph.offsets, neighbors=graph.neighbors, via=graph.via)
+    write(directory, "compact", sections)
+
+
+def load_compact(directory):
+    """
+    Memory-map the compact snapshot for `directory`.
+
+    Returns (data, graph), where graph is None if none was saved, or None
+    if there is no usable compact snapshot. Every array is a view straight
+    into the mapped file.
+    """
+    sections = read(directory, "compact")
+    if sections is None:
+        return None
+    data = CompactData(sections)
+    graph = None
+    if "offsets" in sections:
+        graph = CoStarGraph(
+            data.person_ids, data.movie_ids,
+            sections["offsets"], sections["neighbors"], sections["via"],
+            data.person_index, data.movie_index
+        )
+    return data, graph
+
+
+def write(directory, kind, sections):
+    """
+    Write `sections` (arrays, byte strings or lists of strings) to the
+    `kind` snapshot for `directory`, replacing it atomically.
+
+    Each section starts at an 8-byte aligned offset after the header and
+    JSON metadata, so read() can memory-map it without copying. Lists of
+    strings are stored NUL-separated along with how many they hold.
+    """
+    layout = {}
+    contents = {}
+    position = 0
+    for name, data in sections.items():
+        if isinstance(data, array):
+            layout[name] = [data.typecode, position, len(data) * data.itemsize]
+            contents[name] = data.tobytes()
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            layout[name] = ["b", position, len(data)]
+            contents[name] = data
+        else:
+            contents[name] = "\0".join(data).encode("utf-8")
+            layout[name] = ["s", position, len(contents[name]), len(data)]
+        position = align(position + layout[name][2])
+
+    metadata = json.dumps({
+        "kind": kind,
+        "byteorder": sys.byteorder,
+        "sources": source_stats(directory),
+        "sections": layout,
+    }).encode("utf-8")
+    start = align(HEADER.size + len(metadata))
+
+    path = snapshot_path(directory, kind)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(metadata)))
+        f.write(metadata)
+        for name, data in contents.items():
+            f.seek(start + layout[name][1])
+            f.write(data)
+        f.truncate(start + position)
+    os.replace(temporary, path)
+
+
+def read(directory, kind):
+    """
+    Memory-map the `kind` snapshot for `directory` and return its
+    sections, or None if there is no snapshot or it holds another kind, was
+    written by another format version, or from different CSV files.
+    """
+    try:
+        with open(snapshot_path(directory, kind), "rb") as f:
+            contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length = HEADER.unpack_from(contents)
+        if magic != MAGIC or version != VERSION:
+            return None
+        metadata = json.loads(contents[HEADER.size:HEADER.size + length])
+        if (metadata["kind"] != kind or
+                metadata["byteorder"] != sys.byteorder or
+                metadata["sources"] != source_stats(directory)):
+            return None
+    except (OSError, ValueError, struct.error):
+        return None
+
+    start = align(HEADER.size + length)
+    view = memoryview(contents)
+    sections = {}
+    for name, (kind, offset, size, *count) in metadata["sections"].items():
+        data = view[start + offset:start + offset + size]
+        if kind == "s":
+            sections[name] = str(data, "utf-8").split("\0") if count[0] else []
+        elif kind == "b":
+            sections[name] = data
+        else:
+            sections[name] = data.cast(kind)
+    return sections
+
+
+def align(position):
+    return (position + 7) & ~7
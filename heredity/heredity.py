@@ -45,45 +45,9 @@ def main():
     # people = load_data(sys.argv[1])
     people = load_data("data/family0.csv")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
-        }
-        for person in people
-    }
-
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    # Compute gene and trait probabilities for each person by exact
+    # inference over the family, rather than enumerating every assignment
+    probabilities = infer(people)
 
     # Print results
     for person in people:
@@ -260,5 +224,194 @@ def normalize(probabilities):
         probabilities[person]["trait"][False] = probabilities[person]["trait"][False]/sum
 
 
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+
+def infer(people):
+    """
+    Return the gene and trait probability distributions of each person,
+    given the known traits, in the same form main fills in by enumeration.
+
+    The family is compiled into factors over how many copies of the gene
+    each person has (see compile_factors), which are grouped into a tree
+    of cliques along an elimination order. Passing sums of products up
+    and back down that tree gives every person's distribution in two
+    sweeps (the junction tree form of variable elimination), so the cost
+    grows with the size of the family rather than exponentially.
+    """
+    factors = compile_factors(people)
+    order, cliques, parents = clique_tree(people, factors)
+
+    # Give each factor to the clique of its first eliminated person,
+    # which contains everyone else in the factor
+    position = {person: i for i, person in enumerate(order)}
+    potentials = [(clique, dict.fromkeys(itertools.product(GENES, repeat=len(clique)), 1.0))
+                  for clique in cliques]
+    for factor in factors:
+        i = min(position[person] for person in factor[0])
+        potentials[i] = multiply(potentials[i], factor)
+
+    children = [[] for _ in order]
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(i)
+
+    # Collect towards the roots: cliques are eliminated before their parents
+    upward = [None] * len(order)
+    for i in range(len(order)):
+        belief = potentials[i]
+        for child in children[i]:
+            belief = multiply(belief, upward[child])
+        if parents[i] is not None:
+            upward[i] = marginalize(belief, cliques[i][1:])
+
+    # Distribute back down, each clique leaving out its child's own message
+    downward = [None] * len(order)
+    beliefs = [None] * len(order)
+    for i in reversed(range(len(order))):
+        belief = potentials[i]
+        if downward[i] is not None:
+            belief = multiply(belief, downward[i])
+        for child in children[i]:
+            others = belief
+            for sibling in children[i]:
+                if sibling != child:
+                    others = multiply(others, upward[sibling])
+            downward[child] = marginalize(others, cliques[child][1:])
+        for child in children[i]:
+            belief = multiply(belief, upward[child])
+        beliefs[i] = belief
+
+    probabilities = dict()
+    for i, person in enumerate(order):
+        gene = marginalize(beliefs[i], (person,))[1]
+        total = sum(gene.values())
+        gene = {genes: gene[(genes,)] / total for genes in GENES}
+        trait = people[person]["trait"]
+        if trait is None:
+            trait = {
+                value: sum(gene[genes] * PROBS["trait"][genes][value] for genes in GENES)
+                for value in (True, False)
+            }
+        else:
+            trait = {True: float(trait), False: float(not trait)}
+        probabilities[person] = {"gene": {genes: gene[genes] for genes in (2, 1, 0)}, "trait": trait}
+    return {person: probabilities[person] for person in people}
+
+
+def compile_factors(people):
+    """
+    Return the factors of the family's Bayesian network over how many
+    copies of the gene each person has, as (people, table) pairs whose
+    table maps each tuple of gene counts for those people to a value:
+        * P(genes) for each person without parents,
+        * P(genes | mother's genes, father's genes) for everyone else,
+        * P(trait | genes) for each person whose trait is known.
+    Unknown traits depend on nothing else, so they sum out to 1.
+    """
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            factors.append(((person,), {(genes,): PROBS["gene"][genes] for genes in GENES}))
+        else:
+            table = dict()
+            for mother_genes, father_genes in itertools.product(GENES, repeat=2):
+                from_mother = passing_probability(mother_genes)
+                from_father = passing_probability(father_genes)
+                table[0, mother_genes, father_genes] = (1 - from_mother) * (1 - from_father)
+                table[1, mother_genes, father_genes] = (
+                    from_mother * (1 - from_father) + from_father * (1 - from_mother)
+                )
+                table[2, mother_genes, father_genes] = from_mother * from_father
+            factors.append(((person, mother, father), table))
+
+        trait = people[person]["trait"]
+        if trait is not None:
+            factors.append(((person,), {(genes,): PROBS["trait"][genes][trait] for genes in GENES}))
+    return factors
+
+
+def passing_probability(genes):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one on, allowing for mutation.
+    """
+    if genes == 2:
+        return 1 - PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    return PROBS["mutation"]
+
+
+def clique_tree(people, factors):
+    """
+    Choose an order to eliminate people in, greedily taking whoever
+    shares factors with the fewest others still left.
+
+    Return the order, the clique formed by eliminating each person (that
+    person first, then the others left sharing a factor with them), and
+    the position of each clique's parent: the clique of whichever of its
+    other people is eliminated next, or None for a root.
+    """
+    neighbors = {person: set() for person in people}
+    for variables, _ in factors:
+        for person in variables:
+            neighbors[person].update(variables)
+    for person in neighbors:
+        neighbors[person].discard(person)
+
+    order = []
+    cliques = []
+    remaining = set(people)
+    while remaining:
+        person = min(remaining, key=lambda person: (len(neighbors[person]), person))
+        others = neighbors.pop(person)
+        for other in others:
+            neighbors[other].discard(person)
+            neighbors[other].update(others - {other})
+        remaining.remove(person)
+        order.append(person)
+        cliques.append((person, *sorted(others)))
+
+    position = {person: i for i, person in enumerate(order)}
+    parents = [
+        min((position[other] for other in clique[1:]), default=None)
+        for clique in cliques
+    ]
+    return order, cliques, parents
+
+
+def multiply(f, g):
+    """
+    Return the product of two factors, over the people of `f` followed by
+    those only in `g`.
+    """
+    variables = f[0] + tuple(person for person in g[0] if person not in f[0])
+    f_positions = [variables.index(person) for person in f[0]]
+    g_positions = [variables.index(person) for person in g[0]]
+    table = dict()
+    for assignment in itertools.product(GENES, repeat=len(variables)):
+        table[assignment] = (
+            f[1][tuple(assignment[i] for i in f_positions)] *
+            g[1][tuple(assignment[i] for i in g_positions)]
+        )
+    return variables, table
+
+
+def marginalize(f, variables):
+    """
+    Return factor `f` summed over everyone not in `variables`.
+    """
+    variables = tuple(variables)
+    positions = [f[0].index(person) for person in variables]
+    table = dict.fromkeys(itertools.product(GENES, repeat=len(variables)), 0.0)
+    for assignment, value in f[1].items():
+        table[tuple(assignment[i] for i in positions)] += value
+    return variables, table
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,159 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pagerank
+import solvers
+
+# How each engine ranks a crawled corpus, given the damping factor,
+# number of samples and random seed
+ENGINES = {
+    "sample": lambda corpus, damping, samples, seed:
+        pagerank.sample_pagerank(corpus, damping, samples),
+    "iterate": lambda corpus, damping, samples, seed:
+        pagerank.iterate_pagerank(corpus, damping),
+    "sample-vectorized": lambda corpus, damping, samples, seed:
+        pagerank.sample_pagerank_vectorized(corpus, damping, samples, seed=seed),
+    "iterate-sparse": lambda corpus, damping, samples, seed:
+        pagerank.iterate_pagerank_sparse(corpus, damping),
+    "gauss-seidel": lambda corpus, damping, samples, seed:
+        solvers.solve_pagerank(corpus, damping, "gauss-seidel"),
+    "quadratic": lambda corpus, damping, samples, seed:
+        solvers.solve_pagerank(corpus, damping, "quadratic"),
+}
+
+# Tolerance of the power iteration every engine is compared against
+REFERENCE_TOLERANCE = 1e-12
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PageRank engines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write a synthetic corpus")
+    generate_parser.add_argument("directory")
+    generate_parser.add_argument("--pages", type=int, default=1000)
+    generate_parser.add_argument("--links", type=float, default=8,
+                                 help="mean number of links per page (default: 8)")
+    generate_parser.add_argument("--skew", type=float, default=1.0,
+                                 help="Zipf exponent of how often pages are linked to (default: 1)")
+    generate_parser.add_argument("--dangling", type=float, default=0.05,
+                                 help="fraction of pages without links (default: 0.05)")
+    generate_parser.add_argument("--seed", type=int)
+
+    run_parser = commands.add_parser("run", help="time engines over a corpus")
+    run_parser.add_argument("directory")
+    run_parser.add_argument("--engines", default=",".join(ENGINES),
+                            help="comma-separated engines (default: all)")
+    run_parser.add_argument("--damping", type=float, default=pagerank.DAMPING)
+    run_parser.add_argument("-n", "--samples", type=int, default=pagerank.SAMPLES)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.directory, args.pages, args.links, args.skew, args.dangling, args.seed)
+        return
+
+    engines = args.engines.split(",")
+    for engine in engines:
+        if engine not in ENGINES:
+            sys.exit(f"Unknown engine: {engine}")
+    if not args.json:
+        print(f"{'engine':<18} {'seconds':>9} {'peak KiB':>10} {'L1 error':>10}")
+    for report in run(args.directory, engines, args.damping, args.samples, args.seed):
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print(f"{report['engine']:<18} {report['seconds']:>9.3f} "
+                  f"{report['peak_kib']:>10.1f} {report['l1_error']:>10.2e}")
+
+
+def generate(directory, pages, links=8, skew=1.0, dangling=0.05, seed=None):
+    """
+    Write `pages` HTML pages named 0.html, 1.html, ... into `directory`.
+
+    Each page has no links with probability `dangling`, and otherwise a
+    Pareto-distributed number of distinct links with mean about `links`.
+    Link targets are drawn with Zipf-distributed popularity of exponent
+    `skew`, so both in- and out-degrees follow power laws.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # Cumulative popularity of pages, shuffled so names do not give it away
+    ranks = list(range(pages))
+    rng.shuffle(ranks)
+    weights = list(itertools.accumulate((rank + 1) ** -skew for rank in ranks))
+
+    for page in range(pages):
+        if rng.random() < dangling or pages < 2:
+            targets = set()
+        else:
+            # paretovariate(2) has mean 2 and a power-law tail
+            count = min(pages - 1, max(1, int(rng.paretovariate(2) * links / 2)))
+            targets = set(rng.choices(range(pages), cum_weights=weights, k=count)) - {page}
+        lines = "\n".join(
+            f'            <li><a href="{target}.html">{target}</a></li>'
+            for target in sorted(targets)
+        )
+        with open(os.path.join(directory, f"{page}.html"), "w", encoding="utf-8") as f:
+            f.write(PAGE.format(name=page, links=lines))
+
+
+def run(directory, engines, damping=pagerank.DAMPING, samples=pagerank.SAMPLES, seed=0):
+    """
+    Rank the corpus in `directory` with each engine, yielding a report
+    dict per engine with its time, peak traced memory and L1 distance
+    from a tight power iteration.
+    """
+    corpus = pagerank.crawl(directory)
+    pages, matrix = pagerank.LinkMatrix.from_corpus(corpus)
+    reference = dict(zip(pages, pagerank.power_iteration(
+        matrix, damping, REFERENCE_TOLERANCE).tolist()))
+
+    for engine in engines:
+        rank = ENGINES[engine]
+        start = time.perf_counter()
+        ranks = rank(corpus, damping, samples, seed)
+        seconds = time.perf_counter() - start
+
+        # Memory is traced in a separate run so tracing does not skew timings
+        tracemalloc.start()
+        rank(corpus, damping, samples, seed)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        yield {
+            "engine": engine,
+            "pages": len(pages),
+            "links": len(matrix.indices),
+            "seconds": seconds,
+            "peak_kib": peak / 1024,
+            "l1_error": sum(abs(ranks[page] - reference[page]) for page in pages)
+        }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import math
+import time
+import tracemalloc
+from statistics import NormalDist
+
+from pagerank import (
+    DAMPING, SAMPLES, TOLERANCE, WALKERS, LinkMatrix, crawl, power_iteration, sample_visits
+)
+
+# Batches of surfers whose estimates are compared for confidence intervals
+BATCHES = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how PageRank runs converge.")
+    parser.add_argument("corpus")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("-n", "--samples", type=int, default=SAMPLES)
+    parser.add_argument("--walkers", type=int, default=WALKERS)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+
+    corpus = crawl(args.corpus)
+    iteration = iteration_report(corpus, args.damping, args.tolerance)
+    sampling = sampling_report(corpus, args.damping, args.samples, args.walkers,
+                               args.confidence, seed=args.seed)
+    if args.json:
+        print(json.dumps({"iteration": iteration, "sampling": sampling}))
+        return
+
+    print(f"Iteration converged in {iteration['iterations']} rounds, "
+          f"{iteration['seconds'] * 1000:.3f} ms, peak {iteration['peak_kib']:.1f} KiB")
+    print(f"{'round':>6} {'residual':>12} {'ms':>9} {'KiB':>9}")
+    for record in iteration["rounds"]:
+        print(f"{record['iteration']:>6} {record['residual']:>12.3e} "
+              f"{record['seconds'] * 1000:>9.3f} {record['current_kib']:>9.1f}")
+    print(f"Sampling (n = {sampling['samples']}, {sampling['batches']} batches, "
+          f"{sampling['confidence']:.0%} intervals)")
+    for page in sorted(sampling["ranks"]):
+        print(f"  {page}: {sampling['ranks'][page]:.4f} ± {sampling['half_widths'][page]:.4f}")
+
+
+class IterationMonitor():
+    """
+    Callback for power_iteration recording the residual, elapsed time
+    and traced memory after each round.
+    """
+
+    def __init__(self, callback=None):
+        """
+        If given, `callback(iteration, residual, ranks)` is also called
+        after each round is recorded.
+        """
+        self.callback = callback
+        self.rounds = []
+        self.start = time.perf_counter()
+
+    def __call__(self, iteration, residual, ranks):
+        current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.rounds.append({
+            "iteration": iteration,
+            "residual": float(residual),
+            "seconds": time.perf_counter() - self.start,
+            "current_kib": current / 1024
+        })
+        if self.callback is not None:
+            self.callback(iteration, residual, ranks)
+
+
+def iteration_report(corpus, damping_factor, tolerance=TOLERANCE, callback=None):
+    """
+    Compute PageRank values by power iteration while recording each
+    round, with memory traced by tracemalloc.
+
+    Return a dict with the ranks, the number of iterations, total time,
+    peak traced memory and a list of per-round records.
+    """
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    monitor = IterationMonitor(callback)
+    ranks = power_iteration(matrix, damping_factor, tolerance, callback=monitor)
+    seconds = time.perf_counter() - monitor.start
+    peak = tracemalloc.get_traced_memory()[1]
+    if not tracing:
+        tracemalloc.stop()
+
+    return {
+        "damping_factor": damping_factor,
+        "tolerance": tolerance,
+        "iterations": len(monitor.rounds),
+        "seconds": seconds,
+        "peak_kib": peak / 1024,
+        "rounds": monitor.rounds,
+        "ranks": dict(zip(pages, ranks.tolist()))
+    }
+
+
+def sampling_report(corpus, damping_factor, n, walkers=WALKERS, confidence=0.95,
+                    batches=BATCHES, seed=None):
+    """
+    Estimate PageRank values by sampling with the vectorized sampler,
+    along with a confidence interval for each page.
+
+    Surfers walk independently, so they are split into `batches` and
+    the spread of the batch estimates gives each page's standard error
+    (the method of batch means). Intervals assume that error is normal.
+
+    Return a dict with the ranks, the standard errors and the half-width
+    of each page's interval, keyed by page. Raise ValueError if there
+    are fewer than 2 surfers or batches to compare.
+    """
+    walkers = min(walkers, n)
+    if walkers < 2 or batches < 2:
+        raise ValueError("confidence intervals need at least 2 walkers and batches")
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    batches = min(batches, walkers)
+    start = time.perf_counter()
+    counts = sample_visits(matrix, damping_factor, n, walkers, seed, batches)
+    seconds = time.perf_counter() - start
+
+    sizes = counts.sum(axis=1)
+    estimates = counts / sizes[:, None]
+    ranks = counts.sum(axis=0) / n
+    errors = estimates.std(axis=0, ddof=1) / math.sqrt(batches)
+    half_widths = errors * NormalDist().inv_cdf((1 + confidence) / 2)
+
+    return {
+        "damping_factor": damping_factor,
+        "samples": n,
+        "walkers": walkers,
+        "batches": batches,
+        "confidence": confidence,
+        "seconds": seconds,
+        "ranks": dict(zip(pages, ranks.tolist())),
+        "standard_errors": dict(zip(pages, errors.tolist())),
+        "half_widths": dict(zip(pages, half_widths.tolist()))
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy
+
+from pagerank import DAMPING, TOLERANCE, LinkMatrix, crawl
+from solvers import rows_of
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python distributed.py corpus [workers]")
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    ranks = partitioned_pagerank(crawl(sys.argv[1]), DAMPING, workers)
+    print("PageRank Results from Partitioned Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def partitioned_pagerank(corpus, damping_factor, workers=None, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration split across
+    `workers` processes (all CPUs by default).
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    ranks = partitioned_power_iteration(matrix, damping_factor, workers, tolerance)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def partitioned_power_iteration(matrix, damping_factor, workers=None, tolerance=TOLERANCE):
+    """
+    Return the PageRank vector of a LinkMatrix, computed by worker
+    processes that each own a shard: a range of page numbers holding
+    about the same number of links.
+
+    The rank vectors live in two shared memory buffers that swap roles
+    each round, so every worker reads the ranks of pages in other
+    shards directly and writes only its own range. Over a pipe, the
+    coordinator sends each worker the rank spread from pages without
+    links, and gets back the shard's residual and its new dangling rank.
+    """
+    N = matrix.n
+    workers = max(1, min(workers or os.cpu_count(), N))
+    bounds = shard_bounds(matrix, workers)
+
+    buffers = [shared_memory.SharedMemory(create=True, size=max(1, N * 8)) for _ in range(2)]
+    views = []
+    processes = []
+    connections = []
+    try:
+        views = [numpy.ndarray(N, dtype=numpy.float64, buffer=buffer.buf) for buffer in buffers]
+        views[0][:] = 1 / N
+        for begin, end in zip(bounds, bounds[1:]):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(
+                child, [buffer.name for buffer in buffers], N, begin, end,
+                rows_of(matrix, numpy.arange(begin, end)), matrix.dangling[begin:end],
+                damping_factor
+            ))
+            process.start()
+            child.close()
+            processes.append(process)
+            connections.append(connection)
+
+        current = 0
+        dangling_rank = views[0][matrix.dangling].sum()
+        while True:
+            for connection in connections:
+                connection.send((current, dangling_rank / N))
+            residual = dangling_rank = 0.0
+            for connection in connections:
+                shard_residual, shard_dangling_rank = connection.recv()
+                residual += shard_residual
+                dangling_rank += shard_dangling_rank
+            current = 1 - current
+            if residual < tolerance:
+                ranks = views[current].copy()
+                break
+    finally:
+        # A worker that died has closed its pipe; stopping the others must
+        # not hide the error that brought us here or leave buffers behind
+        try:
+            for connection in connections:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+            for process in processes:
+                process.join()
+        finally:
+            views = None
+            for buffer in buffers:
+                buffer.close()
+                buffer.unlink()
+    return ranks
+
+
+def shard_bounds(matrix, shards):
+    """
+    Return `shards` + 1 page numbers splitting a LinkMatrix into ranges
+    of pages with about the same number of incoming links each.
+    """
+    targets = numpy.linspace(0, len(matrix.indices), shards + 1)
+    bounds = numpy.searchsorted(matrix.indptr, targets)
+    bounds[0], bounds[-1] = 0, matrix.n
+    return numpy.unique(bounds).tolist()
+
+
+def shard_worker(connection, names, N, begin, end, shard, dangling, damping_factor):
+    """
+    Update the ranks of pages begin..end-1 each round, until told to stop.
+    `shard` holds their rows of the link matrix, as returned by rows_of.
+    """
+    rows, indices, data, starts = shard
+    buffers = [shared_memory.SharedMemory(name=name) for name in names]
+    views = [numpy.ndarray(N, dtype=numpy.float64, buffer=buffer.buf) for buffer in buffers]
+    while (message := connection.recv()) is not None:
+        current, share = message
+        ranks = views[current]
+        block = numpy.full(end - begin, share)
+        if len(indices):
+            block[rows] += numpy.add.reduceat(data * ranks[indices], starts)
+        block = damping_factor * block + (1 - damping_factor) / N
+        residual = numpy.abs(block - ranks[begin:end]).sum()
+        views[1 - current][begin:end] = block
+        connection.send((residual, block[dangling].sum()))
+    # Views into the buffers must go before the buffers can be closed
+    ranks = views = None
+    for buffer in buffers:
+        buffer.close()
+
+
+if __name__ == "__main__":
+    main()
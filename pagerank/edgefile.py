@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import sys
+from array import array
+
+import numpy
+
+from pagerank import CHUNK_SIZE, DAMPING, TOLERANCE, dangling_share, extract_links
+
+# Links read from disk per step of the streaming iteration
+BLOCK_EDGES = 1 << 22
+
+# One link on disk: source and target page numbers
+EDGE = numpy.dtype([("source", "<i8"), ("target", "<i8")])
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python edgefile.py corpus edges")
+    if not os.path.isdir(sys.argv[2]):
+        EdgeFile.write(sys.argv[1], sys.argv[2])
+    ranks = iterate_pagerank_external(sys.argv[2], DAMPING)
+    print("PageRank Results from Out-of-Core Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class EdgeFile():
+    """
+    Link graph of a corpus stored on disk in the directory `path`.
+
+    pages.txt lists the page names in order, one per line, and
+    out_degree.npy holds how many pages each page links to. edges.bin is
+    a flat array of (source, target) page number pairs sorted by source,
+    which is memory-mapped rather than read, so only the per-page arrays
+    need to fit in memory.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "pages.txt"), encoding="utf-8") as f:
+            self.pages = f.read().split("\n") if os.path.getsize(f.name) else []
+        self.out_degree = numpy.load(os.path.join(path, "out_degree.npy"))
+        edges = os.path.join(path, "edges.bin")
+        if os.path.getsize(edges):
+            self.edges = numpy.memmap(edges, dtype=EDGE, mode="r")
+        else:
+            self.edges = numpy.empty(0, dtype=EDGE)
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def write(cls, directory, path, processes=None, chunk_size=CHUNK_SIZE):
+        """
+        Parse the HTML pages in `directory` across a pool of `processes`
+        worker processes and write their link graph to `path`, appending
+        each page's links to the edge file as soon as it is parsed.
+        """
+        pages = sorted(
+            filename for filename in os.listdir(directory)
+            if filename.endswith(".html")
+        )
+        index = {page: i for i, page in enumerate(pages)}
+        tasks = [(os.path.join(directory, page), chunk_size) for page in pages]
+        out_degree = numpy.zeros(len(pages), dtype=numpy.int64)
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(pages))
+        with open(os.path.join(path, "edges.bin"), "wb") as f, \
+                multiprocessing.Pool(processes) as pool:
+            for source, links in enumerate(pool.imap(extract_links, tasks, chunksize=64)):
+                edges = array("q")
+                for link in sorted(links - {pages[source]}):
+                    if link in index:
+                        edges.extend((source, index[link]))
+                out_degree[source] = len(edges) // 2
+                edges.tofile(f)
+        numpy.save(os.path.join(path, "out_degree.npy"), out_degree)
+        return cls(path)
+
+    def blocks(self, size=BLOCK_EDGES):
+        """
+        Yield the source and target arrays of consecutive runs of at most
+        `size` links.
+        """
+        for start in range(0, len(self.edges), size):
+            block = self.edges[start:start + size]
+            yield block["source"], block["target"]
+
+
+def iterate_pagerank_external(path, damping_factor, tolerance=TOLERANCE, block_size=BLOCK_EDGES):
+    """
+    Return PageRank values for the link graph saved by EdgeFile.write at
+    `path`, as iterate_pagerank does for a corpus in memory.
+    """
+    graph = EdgeFile(path)
+    ranks = stream_power_iteration(graph, damping_factor, tolerance, block_size)
+    return dict(zip(graph.pages, ranks.tolist()))
+
+
+def stream_power_iteration(graph, damping_factor, tolerance=TOLERANCE, block_size=BLOCK_EDGES):
+    """
+    Return the PageRank vector of an EdgeFile, streaming its links from
+    disk `block_size` at a time each round. Only the rank vectors and
+    per-page arrays are held in memory.
+    """
+    N = len(graph)
+    dangling = graph.out_degree == 0
+    share = numpy.zeros(N)
+    share[~dangling] = 1 / graph.out_degree[~dangling]
+
+    ranks = numpy.full(N, 1 / N)
+    while True:
+        weights = ranks * share
+        new_ranks = numpy.zeros(N)
+        for sources, targets in graph.blocks(block_size):
+            numpy.add.at(new_ranks, targets, weights[sources])
+        new_ranks += dangling_share(ranks, dangling)
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor) / N
+        residual = numpy.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residual < tolerance:
+            return ranks
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import sys
+import numpy
+
+from pagerank import (
+    CHUNK_SIZE, DAMPING, TOLERANCE, LinkMatrix, collect_edges, extract_links, power_iteration
+)
+
+STATE_FILENAME = ".pagerank_state.npz"
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python incremental.py corpus [state]")
+    ranks, changes = incremental_pagerank(sys.argv[1], DAMPING, *sys.argv[2:])
+    print(f"Added {len(changes['added'])}, removed {len(changes['removed'])}, "
+          f"modified {len(changes['modified'])} pages")
+    print("PageRank Results from Incremental Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def incremental_pagerank(directory, damping_factor, state_path=None, tolerance=TOLERANCE):
+    """
+    Return PageRank values for the corpus in `directory`, reusing the
+    state saved by the previous run.
+
+    Only pages added or modified since that run (by size and modification
+    time) are parsed again, and iteration starts from the previous ranks.
+    The new link graph and ranks are saved for the next run.
+
+    Return the ranks dictionary and a dictionary listing the "added",
+    "removed" and "modified" pages.
+    """
+    if state_path is None:
+        state_path = os.path.join(directory, STATE_FILENAME)
+    state = load_state(state_path, damping_factor)
+
+    pages = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    stats = [os.stat(os.path.join(directory, page)) for page in pages]
+    sizes = numpy.array([stat.st_size for stat in stats], dtype=numpy.int64)
+    mtimes = numpy.array([stat.st_mtime_ns for stat in stats], dtype=numpy.int64)
+
+    # Link targets of each page by name, kept even for pages outside the
+    # corpus so that links to a page added later are not lost
+    old = dict()
+    if state is not None:
+        names = state["link_names"].tolist()
+        offsets = state["link_offsets"]
+        for i, page in enumerate(state["pages"].tolist()):
+            old[page] = (
+                state["sizes"][i], state["mtimes"][i],
+                {names[target] for target in state["link_targets"][offsets[i]:offsets[i + 1]]}
+            )
+
+    changes = {"added": [], "removed": sorted(set(old) - set(pages)), "modified": []}
+    links = []
+    for i, page in enumerate(pages):
+        if page not in old:
+            changes["added"].append(page)
+        elif (old[page][0], old[page][1]) != (sizes[i], mtimes[i]):
+            changes["modified"].append(page)
+        else:
+            links.append(old[page][2])
+            continue
+        links.append(extract_links((os.path.join(directory, page), CHUNK_SIZE)))
+
+    index = {page: i for i, page in enumerate(pages)}
+    sources, targets = collect_edges(pages, index, links)
+    matrix = LinkMatrix(len(pages), sources, targets)
+
+    # Start from the previous ranks, giving new pages an even share
+    ranks = numpy.full(len(pages), 1 / len(pages))
+    if state is not None:
+        previous = dict(zip(state["pages"].tolist(), state["ranks"].tolist()))
+        for i, page in enumerate(pages):
+            if page in previous:
+                ranks[i] = previous[page]
+        ranks /= ranks.sum()
+    ranks = power_iteration(matrix, damping_factor, tolerance, ranks)
+
+    save_state(state_path, damping_factor, pages, sizes, mtimes, links, ranks)
+    return dict(zip(pages, ranks.tolist())), changes
+
+
+def load_state(path, damping_factor):
+    """
+    Return the arrays saved by a previous run with the same damping
+    factor, or None if there are none.
+    """
+    try:
+        with numpy.load(path) as state:
+            if state["damping"] != damping_factor:
+                return None
+            return {name: state[name] for name in state.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_state(path, damping_factor, pages, sizes, mtimes, links, ranks):
+    """
+    Save the corpus file stats, every page's link targets and the ranks,
+    replacing the previous state atomically.
+    """
+    names = sorted(set().union(*links)) if links else []
+    name_index = {name: i for i, name in enumerate(names)}
+    offsets = numpy.zeros(len(pages) + 1, dtype=numpy.int64)
+    targets = []
+    for i, page_links in enumerate(links):
+        targets.extend(name_index[link] for link in sorted(page_links))
+        offsets[i + 1] = len(targets)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        numpy.savez(
+            f,
+            damping=damping_factor,
+            pages=numpy.array(pages, dtype=str),
+            sizes=sizes,
+            mtimes=mtimes,
+            link_names=numpy.array(names, dtype=str),
+            link_offsets=offsets,
+            link_targets=numpy.array(targets, dtype=numpy.int64),
+            ranks=ranks
+        )
+    os.replace(temporary, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
+import multiprocessing
 import os
 import random
 import re
 import sys
+from array import array
 import numpy
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Independent random surfers advanced together by the vectorized sampler
+WALKERS = 1000
+
+# Characters read at a time when streaming HTML files
+CHUNK_SIZE = 1 << 16
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# The start of a tag that LINK could still match once more text arrives
+PARTIAL_LINK = re.compile(r"<(?:a(?:\s+(?:[^>]*?href=\"[^\"]*|[^>]*))?)?")
+
+# L1 distance between successive rank vectors at which iteration stops
+TOLERANCE = 1e-6
+
 
 def main():
     if len(sys.argv) != 2:
@@ -49,6 +65,70 @@ def crawl(directory):
     return pages
 
 
+def crawl_edges(directory, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Parse a directory of HTML pages across a pool of `processes` worker
+    processes (all CPUs by default), streaming each file `chunk_size`
+    characters at a time.
+
+    Return the sorted page names and two parallel integer arrays giving
+    the source and target page number of every link between different
+    pages in the corpus, with each link listed once.
+    """
+    pages = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    index = {page: i for i, page in enumerate(pages)}
+    tasks = [(os.path.join(directory, page), chunk_size) for page in pages]
+
+    if processes == 1:
+        results = map(extract_links, tasks)
+        return pages, *collect_edges(pages, index, results)
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.imap(extract_links, tasks, chunksize=64)
+        return pages, *collect_edges(pages, index, results)
+
+
+def collect_edges(pages, index, results):
+    sources = array("q")
+    targets = array("q")
+    for source, links in enumerate(results):
+        for link in sorted(links - {pages[source]}):
+            if link in index:
+                sources.append(source)
+                targets.append(index[link])
+    return numpy.frombuffer(sources, dtype=numpy.int64), numpy.frombuffer(targets, dtype=numpy.int64)
+
+
+def extract_links(task):
+    """
+    Return the set of link targets in one HTML file, read in chunks.
+
+    A tag cut off at the end of a chunk is carried over and scanned again
+    with the next one, so no link is missed or cut short.
+    """
+    path, chunk_size = task
+    links = set()
+    carry = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            text = carry + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            if not chunk:
+                return links
+            # The earliest tag that could still become a link, since a tag
+            # may hold further "<" characters inside quoted attributes
+            start = text.find("<", end)
+            while start != -1 and not PARTIAL_LINK.fullmatch(text, start):
+                start = text.find("<", start + 1)
+            carry = text[start:] if start != -1 else ""
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -130,24 +210,28 @@ def iterate_pagerank(corpus, damping_factor):
     init_value = 1/N
     for i in corpus:
         pageranks[i] = init_value
-        if len(corpus[i]) == 0:
-            corpus[i] = corpus.keys()
+
+    # pages linking to each page, and pages with no links at all, whose
+    # rank is spread over every page without changing the corpus; links
+    # to pages outside the corpus are not followed
+    pages_that_link_to = {i: [] for i in corpus}
+    for page in corpus:
+        for link in corpus[page]:
+            if link in pages_that_link_to:
+                pages_that_link_to[link].append(page)
+    dangling = [page for page in corpus if len(corpus[page]) == 0]
+
     converged = False
     # each updating round
     while (not converged):
         converged = True
         new_pageranks = dict()
+        dangling_rank = dangling_share(pageranks, dangling)
         # update each value using the formula
         for i in pageranks:
             new_rank = (1-damping_factor)/N # first part of the formula
-            # linked_pages = corpus[i]
-            pages_that_link_to_i = []
-            for page in corpus:
-                if i in corpus[page]:
-                    pages_that_link_to_i.append(page)
-                    
-            summation = 0
-            for j in pages_that_link_to_i:
+            summation = dangling_rank
+            for j in pages_that_link_to[i]:
                 summation = summation + (pageranks[j]/len(corpus[j]))
             new_rank = new_rank + (damping_factor * summation) # adding the second part of the formula
             if abs(pageranks[i] - new_rank) > 0.001:
@@ -157,5 +241,266 @@ def iterate_pagerank(corpus, damping_factor):
     return pageranks
 
 
+class LinkMatrix():
+    """
+    Column-stochastic link matrix of a corpus in CSR form.
+
+    Pages are numbered 0..n-1. Row i lists the pages linking to page i in
+    indices[indptr[i]:indptr[i + 1]], each weighted in `data` by one over
+    its number of links. Pages without links have no column; they are
+    flagged in `dangling` so their rank can be spread over every page.
+
+    The links on page j, sorted, are also kept in
+    out_indices[out_indptr[j]:out_indptr[j + 1]] for walking the graph.
+    """
+
+    def __init__(self, n, sources, targets):
+        """
+        Build the matrix for `n` pages from parallel integer arrays of
+        link sources and targets.
+        """
+        sources = numpy.asarray(sources, dtype=numpy.int64)
+        targets = numpy.asarray(targets, dtype=numpy.int64)
+        order = numpy.argsort(targets, kind="stable")
+        out_degree = numpy.bincount(sources, minlength=n)
+
+        self.n = n
+        self.indices = sources[order]
+        self.indptr = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(targets, minlength=n), out=self.indptr[1:])
+        self.data = 1 / out_degree[self.indices]
+        self.dangling = out_degree == 0
+
+        self.out_degree = out_degree
+        self.out_indptr = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(out_degree, out=self.out_indptr[1:])
+        self.out_indices = targets[numpy.lexsort((targets, sources))]
+
+        # Rows with at least one link, and where each one starts
+        self.rows = numpy.flatnonzero(self.indptr[:-1] < self.indptr[1:])
+        self.starts = self.indptr[self.rows]
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the matrix for a corpus as returned by `crawl`.
+        Return the page names in index order and the matrix.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                if link in index:
+                    sources.append(index[page])
+                    targets.append(index[link])
+        return pages, cls(len(pages), sources, targets)
+
+    def dot(self, ranks):
+        """
+        Return the matrix times `ranks`, a vector of one value per page or
+        an array with one column of such values per rank vector.
+        """
+        result = numpy.zeros(ranks.shape)
+        if len(self.indices):
+            data = self.data.reshape(-1, *(1,) * (ranks.ndim - 1))
+            result[self.rows] = numpy.add.reduceat(
+                data * ranks[self.indices], self.starts, axis=0
+            )
+        return result
+
+
+def dangling_share(ranks, dangling):
+    """
+    Return the rank every page receives from the pages flagged in
+    `dangling`, which have no links. Their rank is spread evenly over
+    all pages as a single value, instead of giving them links to every
+    page.
+
+    `ranks` is either a dictionary of page ranks, with `dangling` listing
+    page names, or an array indexed by the `dangling` mask or indices.
+    """
+    if isinstance(ranks, dict):
+        return sum(ranks[page] for page in dangling) / len(ranks)
+    return ranks[dangling].sum() / len(ranks)
+
+
+def sample_pagerank_vectorized(corpus, damping_factor, n, walkers=WALKERS, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with many
+    random surfers at once, each starting on a page at random.
+
+    Every step draws the random numbers for all surfers in one batch: a
+    surfer follows a random link on its page with probability
+    `damping_factor`, and otherwise (or if the page has no links) jumps
+    to a page chosen at random from the whole corpus.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    counts = sample_visits(matrix, damping_factor, n, walkers, seed)
+    return dict(zip(pages, (counts / n).tolist()))
+
+
+def sample_visits(matrix, damping_factor, n, walkers=WALKERS, seed=None, batches=None):
+    """
+    Return how many of `n` samples landed on each page of a LinkMatrix,
+    walking `walkers` surfers in parallel.
+
+    If `batches` is given, surfers are dealt round-robin into that many
+    batches and an array with one row of counts per batch is returned.
+    """
+    N = matrix.n
+    rng = numpy.random.default_rng(seed)
+    walkers = max(1, min(walkers, n))
+    rows = batches or 1
+    counts = numpy.zeros(rows * N, dtype=numpy.int64)
+    offsets = numpy.arange(walkers) % rows * N
+
+    # Start each surfer on a page drawn from the PageRank distribution
+    # itself, by following a geometric number of links from a random
+    # page, so that short walks are not biased toward a uniform start
+    current = rng.integers(0, N, walkers)
+    if damping_factor < 1:
+        steps = rng.geometric(1 - damping_factor, walkers) - 1
+        moving = numpy.flatnonzero(steps)
+        while len(moving):
+            follow = matrix.out_degree[current[moving]] > 0
+            current[moving] = surf(matrix, current[moving], follow, rng)
+            steps[moving] -= 1
+            moving = moving[steps[moving] > 0]
+
+    remaining = n
+    while True:
+        step = current[:remaining]
+        counts += numpy.bincount(offsets[:len(step)] + step, minlength=rows * N)
+        remaining -= len(step)
+        if remaining <= 0:
+            return counts.reshape(rows, N) if batches else counts
+
+        follow = (rng.random(walkers) < damping_factor) & (matrix.out_degree[current] > 0)
+        current = surf(matrix, current, follow, rng)
+
+
+def surf(matrix, current, follow, rng):
+    """
+    Return the next pages of surfers on pages `current` of a LinkMatrix.
+    Surfers flagged in `follow` take a random link on their page, and
+    the others jump to a page chosen at random.
+    """
+    degree = matrix.out_degree[current]
+    choice = (rng.random(len(current)) * degree).astype(numpy.int64)
+    following = current[follow]
+    current = rng.integers(0, matrix.n, len(current))
+    current[follow] = matrix.out_indices[matrix.out_indptr[following] + choice[follow]]
+    return current
+
+
+def iterate_pagerank_sparse(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over the
+    sparse link matrix of the corpus, until successive rank vectors are
+    within `tolerance` of each other in L1 distance.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    ranks = power_iteration(matrix, damping_factor, tolerance)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def power_iteration(matrix, damping_factor, tolerance=TOLERANCE, ranks=None, callback=None):
+    """
+    Return the PageRank vector of a LinkMatrix, starting from `ranks` (or
+    a uniform vector) and iterating until the L1 change drops below
+    `tolerance`. Rank on pages without links is spread over every page.
+
+    If given, `callback(iteration, residual, ranks)` is called after each
+    round, numbered from 1.
+    """
+    N = matrix.n
+    if ranks is None:
+        ranks = numpy.full(N, 1 / N)
+    iteration = 0
+    while True:
+        new_ranks = damping_factor * (matrix.dot(ranks) + dangling_share(ranks, matrix.dangling))
+        new_ranks += (1 - damping_factor) / N
+        residual = numpy.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iteration += 1
+        if callback is not None:
+            callback(iteration, residual, ranks)
+        if residual < tolerance:
+            return ranks
+
+
+def personalized_pagerank(corpus, damping_factor, teleports, tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for each entry of `teleports`,
+    computed together in one batched power iteration over the corpus.
+
+    Each teleport is either a collection of seed pages, jumped to with
+    equal probability, or a dictionary of page weights. A surfer who
+    jumps instead of following a link (or whose page has no links) lands
+    according to the teleport rather than uniformly on any page.
+
+    Return a dictionary mapping each key of `teleports` to a dictionary
+    of PageRank values, which sum to 1.
+    """
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    keys = list(teleports)
+    teleport = teleport_matrix(pages, [teleports[key] for key in keys])
+    ranks = personalized_power_iteration(matrix, damping_factor, teleport, tolerance)
+    return {
+        key: dict(zip(pages, ranks[:, column].tolist()))
+        for column, key in enumerate(keys)
+    }
+
+
+def teleport_matrix(pages, teleports):
+    """
+    Return an array with one column per teleport, giving the probability
+    of jumping to each of `pages`.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    teleport = numpy.zeros((len(pages), len(teleports)))
+    for column, seeds in enumerate(teleports):
+        weights = seeds if isinstance(seeds, dict) else dict.fromkeys(seeds, 1)
+        for page, weight in weights.items():
+            if page not in index:
+                raise ValueError(f"teleport page {page!r} is not in the corpus")
+            if weight < 0:
+                raise ValueError(f"teleport weight for {page!r} is negative")
+            teleport[index[page], column] = weight
+        total = teleport[:, column].sum()
+        if total <= 0:
+            raise ValueError("teleport has no weight on any page")
+        teleport[:, column] /= total
+    return teleport
+
+
+def personalized_power_iteration(matrix, damping_factor, teleport, tolerance=TOLERANCE):
+    """
+    Return an array of PageRank vectors of a LinkMatrix, one column for
+    each column of `teleport`, iterating until every column's L1 change
+    drops below `tolerance`. Rank on pages without links is spread by
+    each column's teleport distribution.
+    """
+    ranks = teleport.copy()
+    while True:
+        dangling_rank = ranks[matrix.dangling].sum(axis=0)
+        new_ranks = damping_factor * matrix.dot(ranks)
+        new_ranks += (damping_factor * dangling_rank + 1 - damping_factor) * teleport
+        residual = numpy.abs(new_ranks - ranks).sum(axis=0)
+        ranks = new_ranks
+        if numpy.all(residual < tolerance):
+            return ranks
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+import argparse
+import heapq
+import math
+import os
+import sys
+from bisect import bisect_left, bisect_right
+
+import numpy
+
+from pagerank import DAMPING, crawl, iterate_pagerank_sparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a saved PageRank index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="rank a corpus and save the index")
+    build.add_argument("corpus")
+    build.add_argument("index")
+    top = commands.add_parser("top", help="highest ranked pages")
+    top.add_argument("index")
+    top.add_argument("-k", type=int, default=10)
+    rank = commands.add_parser("rank", help="rank position and percentile of a page")
+    rank.add_argument("index")
+    rank.add_argument("page")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        RankIndex.write(iterate_pagerank_sparse(crawl(args.corpus), DAMPING), args.index)
+        return
+
+    index = RankIndex(args.index)
+    if args.command == "top":
+        for position, (page, value) in enumerate(index.top_k(args.k), 1):
+            print(f"{position:>6}  {page}: {value:.4f}")
+    else:
+        position = index.rank_of_page(args.page)
+        if position is None:
+            sys.exit("Page not found.")
+        print(f"{args.page}: rank {position} of {len(index)}, "
+              f"{index.percentile(args.page):.1f}th percentile")
+
+
+class RankIndex():
+    """
+    PageRank values saved on disk in the directory `path`, sorted best
+    first.
+
+    pages.txt lists the pages one per line in order of decreasing rank
+    (ties by name), and ranks.npy holds their ranks in the same order,
+    memory-mapped when loaded. Queries never rank the corpus again.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "pages.txt"), encoding="utf-8") as f:
+            self.pages = f.read().split("\n") if os.path.getsize(f.name) else []
+        self.ranks = numpy.load(os.path.join(path, "ranks.npy"), mmap_mode="r")
+        self.positions = {page: i for i, page in enumerate(self.pages)}
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def write(cls, ranks, path):
+        """
+        Save a dictionary of PageRank values to `path`.
+        """
+        pages = sorted(ranks, key=lambda page: (-ranks[page], page))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(pages))
+        numpy.save(os.path.join(path, "ranks.npy"),
+                   numpy.array([ranks[page] for page in pages], dtype=numpy.float64))
+        return cls(path)
+
+    def top_k(self, k):
+        """
+        Return the `k` highest ranked pages as (page, rank) pairs, best first.
+        """
+        return list(zip(self.pages[:k], self.ranks[:k].tolist()))
+
+    def rank_of_page(self, page):
+        """
+        Return the position of `page` from 1 for the best, with tied pages
+        sharing the best position among them, or None if it is not indexed.
+        """
+        i = self.positions.get(page)
+        if i is None:
+            return None
+        value = -self.ranks[i]
+        return bisect_left(self.ranks, value, hi=i + 1, key=lambda rank: -rank) + 1
+
+    def percentile(self, page):
+        """
+        Return the percentage of pages ranked strictly lower than `page`,
+        or None if it is not indexed.
+        """
+        i = self.positions.get(page)
+        if i is None:
+            return None
+        value = -self.ranks[i]
+        below = len(self) - bisect_right(self.ranks, value, lo=i, key=lambda rank: -rank)
+        return 100 * below / len(self)
+
+    def value_at_percentile(self, p):
+        """
+        Return the smallest rank reached by at least `p` percent of pages,
+        counting from the top (nearest rank).
+        """
+        if not len(self):
+            return None
+        return float(self.ranks[max(0, math.ceil(p / 100 * len(self)) - 1)])
+
+
+def top_pages(ranks, k):
+    """
+    Return the `k` highest ranked pages of a dictionary of PageRank
+    values as (page, rank) pairs, best first, selecting them with a heap
+    rather than sorting every page.
+    """
+    return heapq.nsmallest(k, ranks.items(), key=lambda item: (-item[1], item[0]))
+
+
+if __name__ == "__main__":
+    main()
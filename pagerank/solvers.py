@@ -0,0 +1,244 @@
+import argparse
+import time
+
+import numpy
+
+from pagerank import DAMPING, TOLERANCE, LinkMatrix, crawl, dangling_share, power_iteration
+
+# Pages updated together in each step of a Gauss-Seidel sweep
+GAUSS_SEIDEL_BLOCKS = 16
+
+# Rounds of power iteration between extrapolations
+EXTRAPOLATE_EVERY = 10
+
+# Most rounds the adaptive solver goes without updating every page
+ADAPTIVE_CHECK_EVERY = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PageRank solvers.")
+    parser.add_argument("corpus")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    pages, matrix = LinkMatrix.from_corpus(crawl(args.corpus))
+    reference = power_iteration(matrix, args.damping, args.tolerance / 1000)
+    print(f"{'solver':<14} {'rounds':>7} {'ms':>9} {'L1 error':>10}")
+    for name, solver in SOLVERS.items():
+        rounds = []
+        start = time.perf_counter()
+        ranks = solver(matrix, args.damping, args.tolerance,
+                       callback=lambda iteration, residual, ranks: rounds.append(residual))
+        seconds = time.perf_counter() - start
+        error = numpy.abs(ranks - reference).sum()
+        print(f"{name:<14} {len(rounds):>7} {seconds * 1000:>9.3f} {error:>10.2e}")
+
+
+def solve_pagerank(corpus, damping_factor, solver="power", tolerance=TOLERANCE, callback=None):
+    """
+    Return PageRank values for each page, computed over the sparse link
+    matrix of the corpus by `solver`, a key of SOLVERS.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+    pages, matrix = LinkMatrix.from_corpus(corpus)
+    ranks = SOLVERS[solver](matrix, damping_factor, tolerance, callback=callback)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def gauss_seidel(matrix, damping_factor, tolerance=TOLERANCE, callback=None, blocks=GAUSS_SEIDEL_BLOCKS):
+    """
+    Return the PageRank vector of a LinkMatrix by block Gauss-Seidel
+    sweeps: pages are updated in place, `blocks` runs of them at a time,
+    so later pages in a sweep already see the new ranks of earlier ones.
+    Ranks are rescaled to sum to 1 after every sweep.
+    """
+    N = matrix.n
+    bounds = numpy.linspace(0, N, min(blocks, N) + 1).astype(numpy.int64)
+    steps = [rows_of(matrix, numpy.arange(begin, end)) for begin, end in zip(bounds, bounds[1:])]
+
+    ranks = numpy.full(N, 1 / N)
+    dangling_rank = ranks[matrix.dangling].sum()
+    iteration = 0
+    while True:
+        previous = ranks.copy()
+        for (begin, end), (rows, indices, data, starts) in zip(zip(bounds, bounds[1:]), steps):
+            block = numpy.full(end - begin, dangling_rank / N)
+            if len(indices):
+                block[rows] += numpy.add.reduceat(data * ranks[indices], starts)
+            block = damping_factor * block + (1 - damping_factor) / N
+            dangling = matrix.dangling[begin:end]
+            dangling_rank += block[dangling].sum() - ranks[begin:end][dangling].sum()
+            ranks[begin:end] = block
+
+        # Without rescaling, error in the total rank only shrinks by the
+        # damping factor each sweep
+        total = ranks.sum()
+        ranks /= total
+        dangling_rank /= total
+        residual = numpy.abs(ranks - previous).sum()
+        iteration += 1
+        if callback is not None:
+            callback(iteration, residual, ranks)
+        if residual < tolerance:
+            return ranks
+
+
+def aitken(history):
+    """
+    Componentwise Aitken delta-squared extrapolation of the last three
+    rank vectors in `history`.
+    """
+    x0, x1, x2 = history[-3:]
+    g = x1 - x0
+    h = x2 - 2 * x1 + x0
+    safe = numpy.abs(h) > 1e-15
+    extrapolated = x2.copy()
+    extrapolated[safe] = x0[safe] - g[safe] ** 2 / h[safe]
+    return extrapolated
+
+
+def quadratic(history):
+    """
+    Quadratic extrapolation of the last four rank vectors in `history`,
+    assuming the error lies mostly along the next two eigenvectors.
+    """
+    x0, x1, x2, x3 = history[-4:]
+    Y = numpy.column_stack((x1 - x0, x2 - x0))
+    gamma = numpy.linalg.lstsq(Y, -(x3 - x0), rcond=None)[0]
+    g1, g2, g3 = gamma[0], gamma[1], 1.0
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+def extrapolated_iteration(matrix, damping_factor, tolerance=TOLERANCE, callback=None,
+                           extrapolate=quadratic, every=EXTRAPOLATE_EVERY):
+    """
+    Return the PageRank vector of a LinkMatrix by power iteration,
+    replacing the ranks with `extrapolate(history)` of the latest rounds
+    every `every` rounds. Extrapolated ranks are clipped to be
+    non-negative and rescaled to sum to 1.
+    """
+    N = matrix.n
+    ranks = numpy.full(N, 1 / N)
+    history = [ranks]
+    iteration = 0
+    while True:
+        new_ranks = damping_factor * (matrix.dot(ranks) + dangling_share(ranks, matrix.dangling))
+        new_ranks += (1 - damping_factor) / N
+        residual = numpy.abs(new_ranks - ranks).sum()
+        iteration += 1
+        history = history[-3:] + [new_ranks]
+        if residual >= tolerance and iteration % every == 0 and len(history) == 4:
+            new_ranks = numpy.clip(extrapolate(history), 0, None)
+            new_ranks /= new_ranks.sum()
+            history = [new_ranks]
+        ranks = new_ranks
+        if callback is not None:
+            callback(iteration, residual, ranks)
+        if residual < tolerance:
+            return ranks
+
+
+def adaptive_iteration(matrix, damping_factor, tolerance=TOLERANCE, callback=None,
+                       every=ADAPTIVE_CHECK_EVERY):
+    """
+    Return the PageRank vector of a LinkMatrix by power iteration that
+    stops updating pages once their rank changes by less than
+    tolerance / N in a round, only recomputing the rest.
+
+    Every `every` rounds, or sooner once the pages still changing have
+    settled, a round updates every page. Convergence is only checked on
+    those rounds, and the pages they move are the ones updated next.
+    """
+    N = matrix.n
+    threshold = tolerance / N
+    ranks = numpy.full(N, 1 / N)
+    everything = numpy.arange(N)
+    full_rows = rows_of(matrix, everything)
+    active = everything
+    rows, indices, data, starts = full_rows
+    full = True
+    iteration = 0
+    while True:
+        updated = numpy.full(len(active), dangling_share(ranks, matrix.dangling))
+        if len(indices):
+            updated[rows] += numpy.add.reduceat(data * ranks[indices], starts)
+        updated = damping_factor * updated + (1 - damping_factor) / N
+
+        change = numpy.abs(updated - ranks[active])
+        residual = change.sum()
+        ranks[active] = updated
+        if not full:
+            # Frozen pages keep the total rank from being conserved
+            ranks /= ranks.sum()
+        iteration += 1
+        if callback is not None:
+            callback(iteration, residual, ranks)
+
+        if full:
+            if residual < tolerance:
+                return ranks
+            active = everything[change >= threshold]
+            rows, indices, data, starts = rows_of(matrix, active)
+            full = False
+        elif residual < tolerance or iteration % every == 0:
+            active = everything
+            rows, indices, data, starts = full_rows
+            full = True
+        else:
+            keep = change >= threshold
+            if not keep.all():
+                active = active[keep]
+                rows, indices, data, starts = rows_of_kept(rows, indices, data, starts, keep)
+
+
+def rows_of(matrix, pages):
+    """
+    Gather the rows of a LinkMatrix for `pages` into their own CSR
+    arrays. Return the positions (in `pages`) of the rows that have
+    entries, the entries' columns and weights, and where each of those
+    rows starts.
+    """
+    begins = matrix.indptr[pages]
+    lengths = matrix.indptr[pages + 1] - begins
+    rows = numpy.flatnonzero(lengths)
+    starts = numpy.zeros(len(rows), dtype=numpy.int64)
+    numpy.cumsum(lengths[rows][:-1], out=starts[1:])
+    positions = numpy.arange(lengths.sum()) - numpy.repeat(starts - begins[rows], lengths[rows])
+    return rows, matrix.indices[positions], matrix.data[positions], starts
+
+
+def rows_of_kept(rows, indices, data, starts, keep):
+    """
+    Drop the rows not flagged in `keep` (indexed by page position) from
+    arrays returned by rows_of, renumbering the positions that remain.
+    """
+    ends = numpy.append(starts[1:], len(indices))
+    kept = keep[rows]
+    lengths = (ends - starts)[kept]
+    new_starts = numpy.zeros(len(lengths), dtype=numpy.int64)
+    numpy.cumsum(lengths[:-1], out=new_starts[1:])
+    positions = numpy.arange(lengths.sum()) - numpy.repeat(new_starts - starts[kept], lengths)
+    renumbered = numpy.cumsum(keep) - 1
+    return renumbered[rows[kept]], indices[positions], data[positions], new_starts
+
+
+# Solvers by name, each returning a rank vector for a LinkMatrix
+SOLVERS = {
+    "power": lambda matrix, damping_factor, tolerance=TOLERANCE, callback=None:
+        power_iteration(matrix, damping_factor, tolerance, callback=callback),
+    "gauss-seidel": gauss_seidel,
+    "aitken": lambda matrix, damping_factor, tolerance=TOLERANCE, callback=None:
+        extrapolated_iteration(matrix, damping_factor, tolerance, callback, aitken),
+    "quadratic": extrapolated_iteration,
+    "adaptive": adaptive_iteration
+}
+
+
+if __name__ == "__main__":
+    main()